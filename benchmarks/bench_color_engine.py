@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import PyOpenColorIO as OCIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from lablib import engines, operators, processors
+
+# Benchmark Constants
+WIDTH = 3840
+HEIGHT = 2160
+RUNS = 5
+THREADS = [1, 2, 4, 8, os.cpu_count()]
+BUILTIN_CONFIG = "cg-config-v2.1.0_aces-v1.3_ocio-v2.3"
+WORKING_SPACE = "ACEScg"
+SEED = 1
+
+
+def get_config_path(root: str) -> str:
+    if os.environ.get("OCIO"):
+        return os.environ["OCIO"]
+    config_path = os.path.join(root, "config.ocio")
+    with open(config_path, "w") as f:
+        f.write(OCIO.Config.CreateFromBuiltinConfig(BUILTIN_CONFIG).serialize())
+    return config_path
+
+
+root = tempfile.mkdtemp(prefix = "lablib_bench_")
+cpr = processors.ColorProcessor(
+    operators = [
+        operators.CDLTransform(
+            slope = [1.1, 1.0, 0.9],
+            offset = [0.01, 0.0, -0.01],
+            power = [1.0, 1.05, 1.0],
+            sat = 0.9
+        ),
+        operators.ColorSpaceTransform(src = WORKING_SPACE, dst = "ACES2065-1")
+    ],
+    config_path = get_config_path(root),
+    staging_dir = root,
+    working_space = WORKING_SPACE
+)
+
+rng = np.random.default_rng(SEED)
+source = rng.uniform(0.0, 4.0, (HEIGHT, WIDTH, 4)).astype(np.float32)
+pixels = WIDTH * HEIGHT
+
+for threads in sorted(set(THREADS)):
+    engine = engines.ColorEngine(cpr, threads = threads)
+    timings = []
+    for _ in range(RUNS):
+        image = source.copy()
+        start = time.perf_counter()
+        engine.apply(image)
+        timings.append(time.perf_counter() - start)
+    engine.close()
+    best = min(timings)
+    print("threads {:>3}: {:.3f}s best, {:.1f} Mpix/s".format(
+        threads, best, pixels / best / 1e6))
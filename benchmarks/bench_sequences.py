@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from lablib import sequences
+
+# Benchmark Constants
+ENTRIES = 100000
+AOVS = ["beauty", "diffuse", "specular", "depth", "normals"]
+RUNS = 5
+
+
+def build_synthetic_dir(root: str) -> None:
+    per_aov = ENTRIES // len(AOVS)
+    for aov in AOVS:
+        for f in range(1001, 1001 + per_aov):
+            # leave a few holes so gap detection is exercised as well
+            if f % 997 == 0:
+                continue
+            open(os.path.join(root, "BLD_010_0010_{}.{:04d}.exr".format(aov, f)), "w").close()
+
+
+root = tempfile.mkdtemp(prefix = "lablib_bench_")
+try:
+    build_synthetic_dir(root)
+    entries = len(os.listdir(root))
+
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        scans = sequences.scan_directory(root)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print("entries: {}".format(entries))
+    print("sequences: {}".format(len(scans)))
+    for s in scans:
+        print("  {} {}-{} gaps={}".format(s.hash_string, s.frame_start, s.frame_end, len(s.gaps)))
+    print("best of {}: {:.3f}s ({:.0f} entries/s)".format(RUNS, best, entries / best))
+finally:
+    shutil.rmtree(root, ignore_errors = True)
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+import numpy as np
+import opentimelineio as otio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from lablib import timecode
+
+# Benchmark Constants
+CONVERSIONS = 1000000
+OTIO_CONVERSIONS = 50000
+VERIFY_SAMPLES = 20000
+RATES = [24.0, 25.0, 24000 / 1001, 30000 / 1001, 60000 / 1001]
+SEED = 1
+
+
+def otio_to_timecodes(frames: np.ndarray, rate: float, drop_frame: bool) -> list:
+    return [
+        otio.opentime.to_timecode(otio.opentime.from_frames(int(f), rate), rate, drop_frame)
+        for f in frames
+    ]
+
+
+def otio_to_frames(timecodes: list, rate: float) -> list:
+    return [otio.opentime.from_timecode(tc, rate).to_frames(rate) for tc in timecodes]
+
+
+rng = np.random.default_rng(SEED)
+
+for rate in RATES:
+    drop_frame = timecode.is_drop_frame_rate(rate)
+    frames = rng.integers(0, int(rate * 86400 * 2), CONVERSIONS)
+
+    sample = frames[:VERIFY_SAMPLES]
+    expected = otio_to_timecodes(sample, rate, drop_frame)
+    if list(timecode.frames_to_timecodes(sample, rate, drop_frame)) != expected:
+        raise RuntimeError(f"frames_to_timecodes does not match OTIO at {rate}!")
+    if list(timecode.timecodes_to_frames(expected, rate)) != otio_to_frames(expected, rate):
+        raise RuntimeError(f"timecodes_to_frames does not match OTIO at {rate}!")
+
+    start = time.perf_counter()
+    tcs = timecode.frames_to_timecodes(frames, rate, drop_frame)
+    to_tc = time.perf_counter() - start
+    start = time.perf_counter()
+    timecode.timecodes_to_frames(tcs, rate)
+    to_frames = time.perf_counter() - start
+
+    start = time.perf_counter()
+    otio_tcs = otio_to_timecodes(frames[:OTIO_CONVERSIONS], rate, drop_frame)
+    otio_to_tc = (time.perf_counter() - start) * CONVERSIONS / OTIO_CONVERSIONS
+    start = time.perf_counter()
+    otio_to_frames(otio_tcs, rate)
+    otio_from_tc = (time.perf_counter() - start) * CONVERSIONS / OTIO_CONVERSIONS
+
+    print("{:.3f}fps{} verified on {} samples".format(
+        rate, " (drop frame)" if drop_frame else "", VERIFY_SAMPLES))
+    print("  frames -> timecode: {:.3f}s lablib, {:.3f}s otio (estimated)".format(
+        to_tc, otio_to_tc))
+    print("  timecode -> frames: {:.3f}s lablib, {:.3f}s otio (estimated)".format(
+        to_frames, otio_from_tc))
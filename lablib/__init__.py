@@ -1,13 +1,27 @@
 from . import (
+    cache,
+    engines,
+    headers,
+    luts,
+    matrices,
     operators,
     processors,
     renderers,
+    sequences,
+    timecode,
     utils
 )
 
 __all__ = [
+    "cache",
+    "engines",
+    "headers",
+    "luts",
+    "matrices",
     "operators",
     "processors",
     "renderers",
+    "sequences",
+    "timecode",
     "utils"
 ]
\ No newline at end of file
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import uuid
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+def get_cache_dir(*parts: str) -> str:
+    root = os.environ.get("LABLIB_CACHE_DIR")
+    if not root:
+        root = Path(tempfile.gettempdir(), "lablib", "cache").as_posix()
+    cache_dir = Path(root, *parts).resolve()
+    cache_dir.mkdir(parents = True, exist_ok = True)
+    return cache_dir.as_posix()
+
+
+def stat_signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def content_signature(path: str, block_size: int = 1 << 16) -> str:
+    # size plus head, middle and tail blocks, cheap but survives copies
+    size = os.stat(path).st_size
+    digest = hashlib.blake2b(str(size).encode(), digest_size = 16)
+    with open(path, "rb") as f:
+        for offset in sorted(set([0, max(0, size // 2 - block_size // 2),
+                                  max(0, size - block_size)])):
+            f.seek(offset)
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    # xxhash when available, it is several times faster than blake2b
+    digest = xxhash.xxh3_128() if xxhash else hashlib.blake2b(digest_size = 16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MetadataCache:
+    def __init__(self,
+                 max_entries: int = 4096,
+                 path: str = None,
+                 persistent: bool = False) -> None:
+        if persistent and not path:
+            path = Path(get_cache_dir(), "metadata.db").as_posix()
+        self.max_entries: int = max_entries
+        self.path: str = path
+        self.hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection = None
+        if self.path:
+            Path(self.path).resolve().parent.mkdir(parents = True, exist_ok = True)
+            self._db = sqlite3.connect(self.path, timeout = 30, check_same_thread = False)
+            with self._lock, self._db:
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("""
+                    CREATE TABLE IF NOT EXISTS metadata (
+                        path TEXT PRIMARY KEY,
+                        size INTEGER,
+                        mtime_ns INTEGER,
+                        data TEXT
+                    )""")
+
+    def _remember(self, key: str, signature: tuple, data: dict) -> None:
+        self._entries[key] = (signature, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last = False)
+
+    def get(self, path: str) -> dict:
+        try:
+            signature = stat_signature(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return dict(entry[1])
+            if self._db:
+                row = self._db.execute(
+                    "SELECT size, mtime_ns, data FROM metadata WHERE path = ?",
+                    (path,)).fetchone()
+                if row and tuple(row[:2]) == signature:
+                    data = json.loads(row[2])
+                    self._remember(path, signature, data)
+                    self.disk_hits += 1
+                    return dict(data)
+            self.misses += 1
+        return None
+
+    def put(self, path: str, data: dict) -> None:
+        try:
+            signature = stat_signature(path)
+        except OSError:
+            return
+        with self._lock:
+            self._remember(path, signature, dict(data))
+            if self._db:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?)",
+                        (path, *signature, json.dumps(data)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db:
+                with self._db:
+                    self._db.execute("DELETE FROM metadata")
+
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries)
+        }
+
+
+_file_hashes: MetadataCache = MetadataCache(max_entries = 65536)
+
+
+def get_file_hash(path: str) -> str:
+    # full content hash, only recomputed when the stat signature changes
+    entry = _file_hashes.get(path)
+    if entry:
+        return entry["hash"]
+    signature = stat_signature(path)
+    digest = file_hash(path)
+    # a file rewritten while hashing must not pin the old content
+    if stat_signature(path) == signature:
+        _file_hashes.put(path, {"hash": digest})
+    return digest
+
+
+class RenderManifest:
+    # per output frame record of what produced it, lives next to the frames
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                self._entries = json.load(f).get("frames", {})
+        except (OSError, ValueError, AttributeError):
+            self._entries = {}
+
+    def save(self) -> None:
+        tmp_path = "{}.{}.tmp".format(self.path, uuid.uuid4().hex)
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                json.dump({"frames": self._entries}, f)
+            os.replace(tmp_path, self.path)
+
+    def get(self, frame: int) -> dict:
+        return self._entries.get(str(frame))
+
+    def is_current(self, frame: int, record: dict, output_path: str) -> bool:
+        entry = self.get(frame)
+        if not entry:
+            return False
+        try:
+            output = list(stat_signature(output_path))
+        except OSError:
+            return False
+        # a truncated or rewritten output no longer matches what we recorded
+        if output[0] == 0 or entry.get("output") != output:
+            return False
+        return all(entry.get(k) == v for k, v in record.items())
+
+    def update(self, frame: int, record: dict, output_path: str) -> None:
+        try:
+            output = list(stat_signature(output_path))
+        except OSError:
+            return
+        with self._lock:
+            self._entries[str(frame)] = dict(record, output = output)
+
+    def remove(self, frame: int) -> None:
+        with self._lock:
+            self._entries.pop(str(frame), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RenderCache:
+    # rendered frames stored by content key, shared across shots and versions
+    def __init__(self,
+                 path: str = None,
+                 max_bytes: int = 50 * 1024 ** 3) -> None:
+        self.path: str = path or get_cache_dir("renders")
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stores: int = 0
+        self.evictions: int = 0
+        self._lock = threading.Lock()
+        Path(self.path).mkdir(parents = True, exist_ok = True)
+
+    @staticmethod
+    def get_key(data: dict) -> str:
+        return hashlib.blake2b(
+            json.dumps(data, sort_keys = True, default = str).encode(),
+            digest_size = 20
+        ).hexdigest()
+
+    def _get_object_path(self, key: str, ext: str) -> Path:
+        return Path(self.path, key[:2], "{}{}".format(key, ext))
+
+    def _link(self, src: str, dest: Path) -> None:
+        # hard links cost nothing, other devices get a copy
+        tmp_path = dest.with_name("{}.{}.tmp".format(dest.name, uuid.uuid4().hex))
+        try:
+            os.link(src, tmp_path.as_posix())
+        except OSError:
+            shutil.copyfile(src, tmp_path.as_posix())
+        os.replace(tmp_path.as_posix(), dest.as_posix())
+
+    def fetch(self, key: str, dest: str) -> bool:
+        dest = Path(dest)
+        obj_path = self._get_object_path(key, dest.suffix)
+        try:
+            stat = os.stat(obj_path.as_posix())
+            self._link(obj_path.as_posix(), dest)
+            # only the access time tracks use, the linked output keeps its mtime
+            os.utime(obj_path.as_posix(), ns = (time.time_ns(), stat.st_mtime_ns))
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, src: str) -> None:
+        obj_path = self._get_object_path(key, Path(src).suffix)
+        if obj_path.is_file():
+            return
+        obj_path.parent.mkdir(parents = True, exist_ok = True)
+        try:
+            self._link(src, obj_path)
+        except OSError:
+            return
+        with self._lock:
+            self.stores += 1
+
+    def _get_objects(self) -> list[tuple[str, os.stat_result]]:
+        objects = []
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    objects.append((entry.path, entry.stat()))
+        return objects
+
+    def evict(self, max_bytes: int = None) -> int:
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        objects = sorted(self._get_objects(), key = lambda o: o[1].st_atime_ns)
+        total = sum(stat.st_size for _, stat in objects)
+        evicted = 0
+        for obj_path, stat in objects:
+            if total <= max_bytes:
+                break
+            Path(obj_path).unlink(missing_ok = True)
+            total -= stat.st_size
+            evicted += 1
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def clear(self) -> None:
+        for obj_path, _ in self._get_objects():
+            Path(obj_path).unlink(missing_ok = True)
+
+    def get_stats(self) -> dict:
+        objects = self._get_objects()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": len(objects),
+            "bytes": sum(stat.st_size for _, stat in objects)
+        }
@@ -0,0 +1,328 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import os
+import math
+
+import numpy as np
+import PyOpenColorIO as OCIO
+
+from . import matrices
+from .processors import ColorProcessor, RepoProcessor, FILTER_RADII
+
+
+def _box(x: np.ndarray) -> np.ndarray:
+    return (np.abs(x) <= 0.5).astype(np.float32)
+
+
+def _triangle(x: np.ndarray) -> np.ndarray:
+    return np.maximum(1.0 - np.abs(x), 0.0).astype(np.float32)
+
+
+def _cubic(x: np.ndarray, a: float = 0.0) -> np.ndarray:
+    # the keys family, a = -0.5 is catmull-rom
+    x = np.abs(x)
+    x2 = x * x
+    x3 = x2 * x
+    return np.where(
+        x < 1.0,
+        (a + 2.0) * x3 - (a + 3.0) * x2 + 1.0,
+        np.where(x < 2.0, a * x3 - 5.0 * a * x2 + 8.0 * a * x - 4.0 * a, 0.0)
+    ).astype(np.float32)
+
+
+def _lanczos3(x: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(x) < 3.0, np.sinc(x) * np.sinc(x / 3.0), 0.0).astype(np.float32)
+
+
+def _blackman_harris(x: np.ndarray) -> np.ndarray:
+    # defined on -1..1, mapped onto one full window period
+    t = (np.clip(x, -1.0, 1.0) + 1.0) * 0.5
+    result = (0.35875 - 0.48829 * np.cos(2.0 * np.pi * t)
+              + 0.14128 * np.cos(4.0 * np.pi * t) - 0.01168 * np.cos(6.0 * np.pi * t))
+    return np.where(np.abs(x) <= 1.0, result, 0.0).astype(np.float32)
+
+
+# name: (radius in source pixels, kernel), radii are shared with the
+# RepoProcessor roi margins. Like OIIO, "cubic" and "blackman-harris"
+# stretch their unit kernels over the whole filter width.
+FILTERS = {
+    "box": (FILTER_RADII["box"], _box),
+    "triangle": (FILTER_RADII["triangle"], _triangle),
+    "bilinear": (FILTER_RADII["triangle"], _triangle),
+    "cubic": (FILTER_RADII["cubic"], lambda x: _cubic(x / FILTER_RADII["cubic"], 0.0)),
+    "catmull-rom": (FILTER_RADII["catmull-rom"], lambda x: _cubic(x, -0.5)),
+    "lanczos3": (FILTER_RADII["lanczos3"], _lanczos3),
+    "blackman-harris": (FILTER_RADII["blackman-harris"],
+                        lambda x: _blackman_harris(x / FILTER_RADII["blackman-harris"]))
+}
+
+
+def _get_filter(name: str) -> tuple:
+    if name not in FILTERS:
+        raise ValueError(f"Unknown filter '{name}'!")
+    return FILTERS[name]
+
+
+def _get_taps(centers: np.ndarray,
+              radius: float,
+              scale: float,
+              kernel: Any,
+              size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # centers are in pixel index space, the footprint widens with scale
+    extent = radius * scale
+    count = int(math.ceil(2.0 * extent)) + 1
+    start = np.ceil(centers - extent).astype(np.int64)
+    index = start[:, None] + np.arange(count)
+    weights = kernel((index - centers[:, None]) / scale)
+    valid = (index >= 0) & (index < size)
+    return np.clip(index, 0, size - 1), weights, valid
+
+
+def _get_footprint(inverse: np.ndarray, x: float, y: float) -> tuple[float, float]:
+    # source pixels covered by one destination pixel around (x, y)
+    points = matrices.transform_points(inverse, np.array([[x, y], [x + 1.0, y], [x, y + 1.0]]))
+    du = np.hypot(*(points[1] - points[0]))
+    dv = np.hypot(*(points[2] - points[0]))
+    return max(1.0, float(du)), max(1.0, float(dv))
+
+
+@dataclass
+class ColorEngine:
+    color_proc: ColorProcessor = None
+    threads: int = None
+    rows_per_task: int = 64
+
+    def __post_init__(self) -> None:
+        if not self.threads:
+            self.threads = os.cpu_count() or 1
+        self._processor: OCIO.Processor = None
+        self._cpu_processor: OCIO.CPUProcessor = None
+        self._pool: ThreadPoolExecutor = None
+        if self.color_proc:
+            self.set_color_processor(self.color_proc)
+
+    def set_color_processor(self, processor: ColorProcessor) -> None:
+        self.color_proc = processor
+        self._processor = processor.get_processor()
+        self._cpu_processor = self._processor.getOptimizedCPUProcessor(
+            OCIO.BitDepth.BIT_DEPTH_F32,
+            OCIO.BitDepth.BIT_DEPTH_F32,
+            OCIO.OptimizationFlags.OPTIMIZATION_DEFAULT
+        )
+
+    def set_threads(self, threads: int) -> None:
+        self.close()
+        self.threads = threads
+
+    def get_processor(self) -> OCIO.Processor:
+        return self._processor
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if not self._pool:
+            self._pool = ThreadPoolExecutor(max_workers = self.threads)
+        return self._pool
+
+    def _apply_rows(self, image: np.ndarray) -> None:
+        height, width, channels = image.shape
+        self._cpu_processor.apply(OCIO.PackedImageDesc(image, width, height, channels))
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        # processes (height, width, 3|4) float32 buffers in place
+        if not self._cpu_processor:
+            raise ValueError("Missing valid ColorProcessor!")
+        if image.dtype != np.float32 or not image.flags.c_contiguous:
+            raise ValueError("Expected a C contiguous float32 image!")
+        if image.ndim != 3 or image.shape[2] not in (3, 4):
+            raise ValueError(f"Expected an RGB or RGBA image, got shape {image.shape}!")
+        height = image.shape[0]
+        if self.threads < 2 or height <= self.rows_per_task:
+            self._apply_rows(image)
+            return image
+        # contiguous row slabs are views into the same buffer
+        slabs = [
+            image[y:y + self.rows_per_task]
+            for y in range(0, height, self.rows_per_task)
+        ]
+        list(self._get_pool().map(self._apply_rows, slabs))
+        return image
+
+    def apply_many(self, images: list[np.ndarray]) -> list[np.ndarray]:
+        return [self.apply(image) for image in images]
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+
+@dataclass
+class RepoEngine:
+    repo_proc: RepoProcessor = None
+    filter: str = "cubic"
+    resize_filter: str = "lanczos3"
+    threads: int = None
+    tile_size: int = 64
+
+    def __post_init__(self) -> None:
+        if not self.threads:
+            self.threads = os.cpu_count() or 1
+        self._pool: ThreadPoolExecutor = None
+
+    def set_repo_processor(self, processor: RepoProcessor) -> None:
+        self.repo_proc = processor
+
+    def set_threads(self, threads: int) -> None:
+        self.close()
+        self.threads = threads
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if not self._pool:
+            self._pool = ThreadPoolExecutor(max_workers = self.threads)
+        return self._pool
+
+    def _run(self, func: Any, jobs: list) -> None:
+        if self.threads < 2 or len(jobs) < 2:
+            for job in jobs:
+                func(*job)
+            return
+        list(self._get_pool().map(lambda job: func(*job), jobs))
+
+    def _warp_tile(self,
+                   image: np.ndarray,
+                   inverse: np.ndarray,
+                   result: np.ndarray,
+                   y0: int,
+                   y1: int,
+                   x0: int,
+                   x1: int,
+                   filter: str) -> None:
+        radius, kernel = _get_filter(filter)
+        v, u = np.mgrid[y0:y1, x0:x1]
+        # sample at destination pixel centers, mapped back to the source
+        points = np.stack([u.ravel() + 0.5, v.ravel() + 0.5], axis = -1)
+        src = matrices.transform_points(inverse, points) - 0.5
+        scale_x, scale_y = _get_footprint(inverse, (x0 + x1) / 2.0, (y0 + y1) / 2.0)
+        height, width = image.shape[:2]
+        ix, wx, vx = _get_taps(src[:, 0], radius, scale_x, kernel, width)
+        iy, wy, vy = _get_taps(src[:, 1], radius, scale_y, kernel, height)
+        total = wx.sum(axis = 1) * wy.sum(axis = 1)
+        # outside the source is black, but still counts towards the weights
+        wx = wx * vx
+        wy = wy * vy
+        flat = image.reshape(-1, image.shape[2])
+        tile = np.zeros((points.shape[0], image.shape[2]), dtype = np.float32)
+        for j in range(iy.shape[1]):
+            row = iy[:, j] * width
+            for k in range(ix.shape[1]):
+                tile += (wy[:, j] * wx[:, k])[:, None] * np.take(flat, row + ix[:, k], axis = 0)
+        tile /= np.where(total == 0.0, 1.0, total)[:, None]
+        result[y0:y1, x0:x1] = tile.reshape(y1 - y0, x1 - x0, -1)
+
+    def warp(self,
+             image: np.ndarray,
+             matrix: np.ndarray,
+             width: int,
+             height: int,
+             filter: str = None) -> np.ndarray:
+        # matrix maps source to destination pixel coordinates
+        image = np.asarray(image, dtype = np.float32)
+        if image.ndim == 2:
+            image = image[..., None]
+        inverse = np.linalg.inv(matrices.as_matrices(matrix))
+        result = np.zeros((height, width, image.shape[2]), dtype = np.float32)
+        step = self.tile_size
+        self._run(self._warp_tile, [
+            (image, inverse, result, y, min(y + step, height), x, min(x + step, width),
+             filter or self.filter)
+            for y in range(0, height, step)
+            for x in range(0, width, step)
+        ])
+        return result
+
+    def _resize_rows(self,
+                     source: np.ndarray,
+                     result: np.ndarray,
+                     index: np.ndarray,
+                     weights: np.ndarray,
+                     start: int,
+                     end: int,
+                     axis: int) -> None:
+        out = np.zeros_like(result[start:end])
+        for k in range(index.shape[1]):
+            if axis == 0:
+                out += weights[start:end, k, None, None] * source[index[start:end, k]]
+            else:
+                out += weights[None, :, k, None] * source[start:end, index[:, k]]
+        result[start:end] = out
+
+    def _resize_axis(self, image: np.ndarray, size: int, axis: int) -> np.ndarray:
+        radius, kernel = _get_filter(self.resize_filter)
+        length = image.shape[axis]
+        ratio = length / size
+        centers = (np.arange(size) + 0.5) * ratio - 0.5
+        index, weights, valid = _get_taps(centers, radius, max(1.0, ratio), kernel, length)
+        # resizing stays inside the image, renormalize on the valid taps
+        weights = weights * valid
+        weights /= np.maximum(weights.sum(axis = 1, keepdims = True), 1e-12)
+        shape = list(image.shape)
+        shape[axis] = size
+        result = np.empty(shape, dtype = np.float32)
+        rows = shape[0]
+        step = max(1, math.ceil(rows / self.threads))
+        self._run(self._resize_rows, [
+            (image, result, index, weights, y, min(y + step, rows), axis)
+            for y in range(0, rows, step)
+        ])
+        return result
+
+    def resize(self, image: np.ndarray, width: int, height: int) -> np.ndarray:
+        image = np.asarray(image, dtype = np.float32)
+        if image.ndim == 2:
+            image = image[..., None]
+        return self._resize_axis(self._resize_axis(image, width, 1), height, 0)
+
+    def apply(self,
+              image: np.ndarray,
+              matrix: list[list[float]] = None,
+              frame: int = None,
+              fused: bool = None,
+              origin: tuple[int, int] = None) -> np.ndarray:
+        # origin is the source position of a partial read, see
+        # RepoProcessor.get_source_roi
+        if not self.repo_proc:
+            raise ValueError("Missing valid RepoProcessor!")
+        if matrix is None:
+            matrix = self.repo_proc.get_matrix_chained(frame = frame)
+        if origin:
+            matrix = matrices.compose(matrix, matrices.translate(origin))
+        if fused is None:
+            fused = self.repo_proc.is_fused()
+        if fused:
+            # one pass at output resolution, the footprint follows the
+            # minification of the fused matrix
+            return self.warp(
+                image,
+                self.repo_proc.get_output_matrix(matrix),
+                self.repo_proc.dest_width,
+                self.repo_proc.dest_height,
+                filter = self.repo_proc.get_fused_filter()
+            )
+        # same stages as RepoProcessor.get_oiiotool_cmd: warp, crop to the
+        # destination aspect and resize to the destination size
+        fitted_width, fitted_height, x_offset, y_offset = self.repo_proc.get_fit_area()
+        # the crop only moves the origin, fold it into the warp
+        warped = self.warp(
+            image,
+            matrices.compose(matrices.translate([x_offset, y_offset]), matrix),
+            fitted_width,
+            fitted_height
+        )
+        return self.resize(warped, self.repo_proc.dest_width, self.repo_proc.dest_height)
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+from typing import BinaryIO
+
+import math
+import struct
+
+from .timecode import is_drop_frame_rate
+
+
+_EXR_MAGIC = b"\x76\x2f\x31\x01"
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+_HEADER_READ_SIZE = 65536
+
+_DPX_UNDEFINED = 0xFFFFFFFF
+_DPX_CHANNELS = {
+    1: 1, 2: 1, 3: 1, 4: 1, 6: 1, 7: 1, 8: 1,
+    50: 3, 51: 4, 52: 4,
+    100: 2, 101: 3, 102: 4, 103: 4
+}
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+
+def _fps(num: float, den: float) -> float:
+    if not num or not den:
+        return None
+    return float(round(float(num / den), 3))
+
+
+def _bcd(value: int) -> int:
+    return (value >> 4) * 10 + (value & 0x0F)
+
+
+def _smpte_timecode(hours: int,
+                    minutes: int,
+                    seconds: int,
+                    frames: int,
+                    drop_frame: bool = False) -> str:
+    return "{:02d}:{:02d}:{:02d}{}{:02d}".format(hours, minutes, seconds,
+                                                 ";" if drop_frame else ":",
+                                                 frames)
+
+
+def _read_cstring(data: bytes, pos: int) -> tuple[str, int]:
+    end = data.index(b"\x00", pos)
+    return data[pos:end].decode("latin-1"), end + 1
+
+
+def _exr_timecode(time_and_flags: int, fps: float = None) -> str:
+    # writers set the drop frame bit at any rate, only 29.97 and 59.94 have one
+    drop_frame = bool(time_and_flags & 0x40) and bool(fps) and is_drop_frame_rate(fps)
+    return _smpte_timecode(
+        hours = _bcd((time_and_flags >> 24) & 0x3F),
+        minutes = _bcd((time_and_flags >> 16) & 0x7F),
+        seconds = _bcd((time_and_flags >> 8) & 0x7F),
+        frames = _bcd(time_and_flags & 0x3F),
+        drop_frame = drop_frame
+    )
+
+
+def _exr_channels(value: bytes) -> int:
+    count = 0
+    pos = 0
+    while pos < len(value) and value[pos] != 0:
+        _, pos = _read_cstring(value, pos)
+        # pixel type, pLinear + reserved, x/y sampling
+        pos += 16
+        count += 1
+    return count
+
+
+def read_exr_header(f: BinaryIO) -> dict:
+    data = f.read(_HEADER_READ_SIZE)
+    if data[:4] != _EXR_MAGIC:
+        return None
+    attrs = {}
+    pos = 8
+    while True:
+        if data[pos] == 0:
+            break
+        name, pos = _read_cstring(data, pos)
+        attr_type, pos = _read_cstring(data, pos)
+        size = struct.unpack_from("<i", data, pos)[0]
+        pos += 4
+        if pos + size > len(data):
+            raise ValueError("EXR header larger than read buffer!")
+        attrs[name] = (attr_type, data[pos:pos + size])
+        pos += size
+
+    result = {}
+    if "dataWindow" in attrs:
+        x_min, y_min, x_max, y_max = struct.unpack("<4i", attrs["dataWindow"][1])
+        result.update({
+            "origin_x": x_min,
+            "origin_y": y_min,
+            "width": x_max - x_min + 1,
+            "height": y_max - y_min + 1
+        })
+    if "displayWindow" in attrs:
+        x_min, y_min, x_max, y_max = struct.unpack("<4i", attrs["displayWindow"][1])
+        result.update({
+            "display_width": x_max - x_min + 1,
+            "display_height": y_max - y_min + 1
+        })
+    if "pixelAspectRatio" in attrs:
+        result["par"] = float(round(struct.unpack("<f", attrs["pixelAspectRatio"][1])[0], 6))
+    if "framesPerSecond" in attrs:
+        result["fps"] = _fps(*struct.unpack("<iI", attrs["framesPerSecond"][1]))
+    if "timeCode" in attrs:
+        result["timecode"] = _exr_timecode(struct.unpack("<2I", attrs["timeCode"][1])[0],
+                                           result.get("fps"))
+    if "channels" in attrs:
+        result["channels"] = _exr_channels(attrs["channels"][1])
+    return result
+
+
+def read_dpx_header(f: BinaryIO) -> dict:
+    data = f.read(2048)
+    if data[:4] == b"SDPX":
+        endian = ">"
+    elif data[:4] == b"XPDS":
+        endian = "<"
+    else:
+        return None
+
+    def u32(pos: int) -> int:
+        return struct.unpack_from(endian + "I", data, pos)[0]
+
+    def f32(pos: int) -> float:
+        value = struct.unpack_from(endian + "f", data, pos)[0]
+        if u32(pos) == _DPX_UNDEFINED or math.isnan(value):
+            return None
+        return value
+
+    result = {
+        "width": u32(772),
+        "height": u32(776),
+        "display_width": u32(772),
+        "display_height": u32(776),
+        "channels": _DPX_CHANNELS.get(data[800])
+    }
+    if len(data) < 1944:
+        return result
+
+    x_offset, y_offset = u32(1408), u32(1412)
+    if x_offset != _DPX_UNDEFINED and y_offset != _DPX_UNDEFINED:
+        result["origin_x"] = x_offset
+        result["origin_y"] = y_offset
+    par_h, par_v = u32(1628), u32(1632)
+    if par_h not in (0, _DPX_UNDEFINED) and par_v not in (0, _DPX_UNDEFINED):
+        result["par"] = float(par_h / par_v)
+    fps = f32(1940) or f32(1724)
+    if fps:
+        result["fps"] = float(round(fps, 3))
+    tc = u32(1920)
+    if tc != _DPX_UNDEFINED:
+        result["timecode"] = _smpte_timecode(
+            hours = _bcd((tc >> 24) & 0xFF),
+            minutes = _bcd((tc >> 16) & 0xFF),
+            seconds = _bcd((tc >> 8) & 0xFF),
+            frames = _bcd(tc & 0xFF)
+        )
+    return result
+
+
+def read_tiff_header(f: BinaryIO) -> dict:
+    data = f.read(8)
+    if data[:4] == b"II*\x00":
+        endian = "<"
+    elif data[:4] == b"MM\x00*":
+        endian = ">"
+    else:
+        return None
+
+    f.seek(struct.unpack_from(endian + "I", data, 4)[0])
+    count = struct.unpack(endian + "H", f.read(2))[0]
+    entries = f.read(count * 12)
+    tags = {}
+    for i in range(count):
+        tag, tag_type, num, value = struct.unpack_from(endian + "HHI4s", entries, i * 12)
+        if tag_type not in (3, 4, 5) or num != 1:
+            continue
+        # rationals do not fit the value field, keep their offset instead
+        tags[tag] = struct.unpack_from(endian + ("H" if tag_type == 3 else "I"), value)[0]
+
+    def rational(offset: int) -> float:
+        f.seek(offset)
+        num, den = struct.unpack(endian + "2I", f.read(8))
+        return num / den if den else None
+
+    if 256 not in tags or 257 not in tags:
+        return None
+    result = {
+        "width": tags[256],
+        "height": tags[257],
+        "display_width": tags[256],
+        "display_height": tags[257],
+        "channels": tags.get(277, 1)
+    }
+    if 282 in tags and 283 in tags:
+        x_res, y_res = rational(tags[282]), rational(tags[283])
+        if x_res and y_res:
+            result["par"] = float(round(y_res / x_res, 6))
+    return result
+
+
+def read_png_header(f: BinaryIO) -> dict:
+    data = f.read(_HEADER_READ_SIZE)
+    if data[:8] != _PNG_MAGIC:
+        return None
+    result = {}
+    pos = 8
+    while pos + 8 <= len(data):
+        length, chunk = struct.unpack_from(">I4s", data, pos)
+        body = data[pos + 8:pos + 8 + length]
+        if chunk == b"IHDR":
+            width, height, _, color_type = struct.unpack_from(">IIBB", body)
+            result.update({
+                "width": width,
+                "height": height,
+                "display_width": width,
+                "display_height": height,
+                "channels": _PNG_CHANNELS.get(color_type)
+            })
+        elif chunk == b"pHYs" and len(body) >= 8:
+            ppu_x, ppu_y = struct.unpack_from(">II", body)
+            if ppu_x and ppu_y:
+                result["par"] = float(round(ppu_y / ppu_x, 6))
+        elif chunk in (b"IDAT", b"IEND"):
+            break
+        pos += length + 12
+    return result or None
+
+
+def read_header(path: str) -> dict:
+    readers = (read_exr_header, read_dpx_header, read_tiff_header, read_png_header)
+    try:
+        with open(path, "rb") as f:
+            for reader in readers:
+                f.seek(0)
+                result = reader(f)
+                if result is not None:
+                    return result
+    except (OSError, ValueError, IndexError, struct.error):
+        return None
+    return None
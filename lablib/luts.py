@@ -0,0 +1,299 @@
+from __future__ import annotations
+from dataclasses import dataclass
+
+import os
+import hashlib
+import uuid
+import xml.etree.ElementTree as ET
+
+from pathlib import Path
+
+import numpy as np
+
+from . import cache
+
+
+# Rec.709 luma weights, the ones the ASC CDL spec uses for saturation
+_CDL_LUMA = np.array([0.2126, 0.7152, 0.0722], dtype = np.float32)
+_CHUNK_PIXELS = 1 << 20
+# bump when parsing changes, so stale .npy caches are not picked up
+_NPY_VERSION = 2
+
+
+@dataclass
+class CubeLut:
+    title: str = None
+    table_1d: np.ndarray = None
+    table_3d: np.ndarray = None
+    domain_min: np.ndarray = None
+    domain_max: np.ndarray = None
+
+    def __post_init__(self) -> None:
+        if self.domain_min is None:
+            self.domain_min = np.zeros(3, dtype = np.float32)
+        if self.domain_max is None:
+            self.domain_max = np.ones(3, dtype = np.float32)
+
+    @property
+    def size(self) -> int:
+        if self.table_3d is not None:
+            return self.table_3d.shape[0]
+        return self.table_1d.shape[0]
+
+    def apply(self,
+              image: np.ndarray,
+              interpolation: str = "tetrahedral") -> np.ndarray:
+        result = np.asarray(image, dtype = np.float32)
+        if self.table_1d is not None:
+            result = apply_1d(result, self.table_1d, self.domain_min, self.domain_max)
+            # a shaped cube feeds the 1d output straight into the 3d lattice
+            if self.table_3d is not None:
+                return apply_3d(result, self.table_3d, interpolation = interpolation)
+            return result
+        return apply_3d(result, self.table_3d, self.domain_min, self.domain_max,
+                        interpolation = interpolation)
+
+
+def _parse_cube(path: str) -> CubeLut:
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+    title = None
+    size_1d = size_3d = 0
+    domain_min = domain_max = None
+    range_3d = None
+    data_start = len(lines)
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(None, 1)
+        key = parts[0].upper()
+        if key == "TITLE":
+            title = parts[1].strip().strip("\"") if len(parts) > 1 else ""
+        elif key == "LUT_1D_SIZE":
+            size_1d = int(line.split()[1])
+        elif key == "LUT_3D_SIZE":
+            size_3d = int(line.split()[1])
+        elif key in ("DOMAIN_MIN", "LUT_1D_INPUT_RANGE"):
+            values = [float(v) for v in line.split()[1:]]
+            domain_min = values if key == "DOMAIN_MIN" else [values[0]] * 3
+            if key == "LUT_1D_INPUT_RANGE":
+                domain_max = [values[1]] * 3
+        elif key == "DOMAIN_MAX":
+            domain_max = [float(v) for v in line.split()[1:]]
+        elif key == "LUT_3D_INPUT_RANGE":
+            range_3d = [float(v) for v in line.split()[1:3]]
+        else:
+            data_start = i
+            break
+    if not size_1d and not size_3d:
+        raise ValueError(f"Missing LUT size in '{path}'!")
+    # everything after the header is plain numbers, parse it in one go
+    data = np.fromstring(" ".join(
+        l for l in lines[data_start:] if l.strip() and not l.lstrip().startswith("#")
+    ), dtype = np.float32, sep = " ")
+    expected = (size_1d + size_3d ** 3) * 3
+    if data.size != expected:
+        raise ValueError(f"Expected {expected} values in '{path}', found {data.size}!")
+    data = data.reshape(-1, 3)
+    table_1d = data[:size_1d].copy() if size_1d else None
+    table_3d = None
+    if range_3d and size_1d:
+        # fold the lattice range into the shaper so both stages share one domain
+        table_1d = (table_1d - range_3d[0]) / (range_3d[1] - range_3d[0])
+    elif range_3d:
+        domain_min = [range_3d[0]] * 3
+        domain_max = [range_3d[1]] * 3
+    if size_3d:
+        # red changes fastest in the file, index the lattice as [r, g, b]
+        table_3d = np.ascontiguousarray(
+            data[size_1d:].reshape(size_3d, size_3d, size_3d, 3).transpose(2, 1, 0, 3))
+    return CubeLut(
+        title = title,
+        table_1d = table_1d,
+        table_3d = table_3d,
+        domain_min = np.array(domain_min, dtype = np.float32) if domain_min else None,
+        domain_max = np.array(domain_max, dtype = np.float32) if domain_max else None
+    )
+
+
+def _get_npy_path(path: str) -> Path:
+    key = "{}:{}:{}:{}".format(_NPY_VERSION, path, *cache.stat_signature(path))
+    return Path(cache.get_cache_dir("luts", "npy"),
+                "{}.npy".format(hashlib.blake2b(key.encode(), digest_size = 16).hexdigest()))
+
+
+def _pack(lut: CubeLut) -> np.ndarray:
+    # header row: 1d size, 3d size, unused, then domain min and max rows
+    size_1d = 0 if lut.table_1d is None else lut.table_1d.shape[0]
+    size_3d = 0 if lut.table_3d is None else lut.table_3d.shape[0]
+    rows = [
+        np.array([[size_1d, size_3d, 0]], dtype = np.float32),
+        lut.domain_min.reshape(1, 3),
+        lut.domain_max.reshape(1, 3)
+    ]
+    if size_1d:
+        rows.append(lut.table_1d)
+    if size_3d:
+        rows.append(lut.table_3d.reshape(-1, 3))
+    return np.concatenate(rows).astype(np.float32)
+
+
+def _unpack(packed: np.ndarray) -> CubeLut:
+    size_1d, size_3d = int(packed[0, 0]), int(packed[0, 1])
+    data = packed[3:]
+    return CubeLut(
+        table_1d = data[:size_1d] if size_1d else None,
+        table_3d = data[size_1d:].reshape(size_3d, size_3d, size_3d, 3) if size_3d else None,
+        domain_min = packed[1],
+        domain_max = packed[2]
+    )
+
+
+def read_cube(path: str, use_cache: bool = True) -> CubeLut:
+    path = Path(path).resolve().as_posix()
+    if not use_cache:
+        return _parse_cube(path)
+    npy_path = _get_npy_path(path)
+    if npy_path.is_file():
+        try:
+            return _unpack(np.load(npy_path.as_posix(), mmap_mode = "r"))
+        except (OSError, ValueError):
+            pass
+    lut = _parse_cube(path)
+    tmp_path = npy_path.with_name("{}.{}.tmp.npy".format(npy_path.stem, uuid.uuid4().hex))
+    np.save(tmp_path.as_posix(), _pack(lut))
+    os.replace(tmp_path.as_posix(), npy_path.as_posix())
+    return lut
+
+
+def read_cc(path: str) -> dict:
+    root = ET.parse(path).getroot()
+    # .cc files hold a single ColorCorrection, .ccc files wrap several
+    if not root.tag.endswith("ColorCorrection"):
+        root = next(e for e in root.iter() if e.tag.endswith("ColorCorrection"))
+    values = {}
+    for element in root.iter():
+        tag = element.tag.rsplit("}", 1)[-1].lower()
+        if tag in ("slope", "offset", "power"):
+            values[tag] = [float(v) for v in element.text.split()]
+        elif tag == "saturation":
+            values["sat"] = float(element.text)
+    return {
+        "id": root.get("id", ""),
+        "slope": values.get("slope", [1.0, 1.0, 1.0]),
+        "offset": values.get("offset", [0.0, 0.0, 0.0]),
+        "power": values.get("power", [1.0, 1.0, 1.0]),
+        "sat": values.get("sat", 1.0)
+    }
+
+
+def apply_cdl(image: np.ndarray,
+              slope: list[float] = None,
+              offset: list[float] = None,
+              power: list[float] = None,
+              sat: float = 1.0,
+              clamp: bool = False) -> np.ndarray:
+    # OCIO v2 defaults to the unclamped style, clamp gives the ASC v1.2 one
+    image = np.asarray(image, dtype = np.float32)
+    rgb = image[..., :3]
+    if slope is not None:
+        rgb = rgb * np.asarray(slope, dtype = np.float32)
+    if offset is not None:
+        rgb = rgb + np.asarray(offset, dtype = np.float32)
+    if clamp:
+        rgb = np.clip(rgb, 0.0, 1.0)
+    if power is not None:
+        # negatives pass through the power function unchanged
+        rgb = np.where(rgb > 0.0,
+                       np.maximum(rgb, 0.0) ** np.asarray(power, dtype = np.float32),
+                       rgb)
+    if sat != 1.0:
+        luma = (rgb @ _CDL_LUMA)[..., None]
+        rgb = luma + sat * (rgb - luma)
+        if clamp:
+            rgb = np.clip(rgb, 0.0, 1.0)
+    result = image.copy()
+    result[..., :3] = rgb
+    return result
+
+
+def apply_1d(image: np.ndarray,
+             table: np.ndarray,
+             domain_min: np.ndarray = None,
+             domain_max: np.ndarray = None) -> np.ndarray:
+    image = np.asarray(image, dtype = np.float32)
+    domain_min = np.zeros(3, np.float32) if domain_min is None else domain_min
+    domain_max = np.ones(3, np.float32) if domain_max is None else domain_max
+    size = table.shape[0]
+    x = (image[..., :3] - domain_min) / (domain_max - domain_min) * (size - 1)
+    x = np.clip(x, 0.0, size - 1)
+    index = np.minimum(x.astype(np.int64), size - 2)
+    frac = x - index
+    channels = np.arange(3)
+    rgb = table[index, channels] * (1.0 - frac) + table[index + 1, channels] * frac
+    result = image.copy()
+    result[..., :3] = rgb
+    return result
+
+
+def _lookup_trilinear(table: np.ndarray, base: np.ndarray, frac: np.ndarray) -> np.ndarray:
+    size = table.shape[0]
+    flat = table.reshape(-1, 3)
+    index = (base[:, 0] * size + base[:, 1]) * size + base[:, 2]
+    fr, fg, fb = frac[:, 0:1], frac[:, 1:2], frac[:, 2:3]
+    r_step, g_step = size * size, size
+    c00 = flat[index] * (1 - fb) + flat[index + 1] * fb
+    c01 = flat[index + g_step] * (1 - fb) + flat[index + g_step + 1] * fb
+    c10 = flat[index + r_step] * (1 - fb) + flat[index + r_step + 1] * fb
+    c11 = flat[index + r_step + g_step] * (1 - fb) + flat[index + r_step + g_step + 1] * fb
+    c0 = c00 * (1 - fg) + c01 * fg
+    c1 = c10 * (1 - fg) + c11 * fg
+    return c0 * (1 - fr) + c1 * fr
+
+
+def _lookup_tetrahedral(table: np.ndarray, base: np.ndarray, frac: np.ndarray) -> np.ndarray:
+    size = table.shape[0]
+    flat = table.reshape(-1, 3)
+    steps = np.array([size * size, size, 1], dtype = np.int64)
+    index = base @ steps
+    # walk the cube diagonal along the axes sorted by their fraction,
+    # the four visited corners form the enclosing tetrahedron.
+    order = np.argsort(-frac, axis = 1)
+    sorted_frac = np.take_along_axis(frac, order, axis = 1)
+    ordered_steps = steps[order]
+    v1 = index + ordered_steps[:, 0]
+    v2 = v1 + ordered_steps[:, 1]
+    v3 = index + steps.sum()
+    return (flat[index] * (1.0 - sorted_frac[:, 0:1])
+            + flat[v1] * (sorted_frac[:, 0:1] - sorted_frac[:, 1:2])
+            + flat[v2] * (sorted_frac[:, 1:2] - sorted_frac[:, 2:3])
+            + flat[v3] * sorted_frac[:, 2:3])
+
+
+def apply_3d(image: np.ndarray,
+             table: np.ndarray,
+             domain_min: np.ndarray = None,
+             domain_max: np.ndarray = None,
+             interpolation: str = "tetrahedral") -> np.ndarray:
+    if interpolation == "tetrahedral":
+        lookup = _lookup_tetrahedral
+    elif interpolation in ("linear", "trilinear"):
+        lookup = _lookup_trilinear
+    else:
+        raise ValueError(f"Unknown interpolation '{interpolation}'!")
+    image = np.asarray(image, dtype = np.float32)
+    table = np.asarray(table, dtype = np.float32)
+    domain_min = np.zeros(3, np.float32) if domain_min is None else domain_min
+    domain_max = np.ones(3, np.float32) if domain_max is None else domain_max
+    size = table.shape[0]
+    result = image.copy()
+    pixels = result.reshape(-1, image.shape[-1])
+    scale = (size - 1) / (domain_max - domain_min)
+    # bounded chunks keep the gather temporaries small on large frames
+    for start in range(0, pixels.shape[0], _CHUNK_PIXELS):
+        chunk = pixels[start:start + _CHUNK_PIXELS]
+        x = np.clip((chunk[:, :3] - domain_min) * scale, 0.0, size - 1)
+        base = np.minimum(x.astype(np.int64), size - 2)
+        chunk[:, :3] = lookup(table, base, x - base)
+    return result
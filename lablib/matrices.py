@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def as_matrices(m: np.ndarray | list) -> np.ndarray:
+    result = np.ascontiguousarray(m, dtype = np.float64)
+    if result.shape[-2:] != (3, 3):
+        raise ValueError(f"Expected 3x3 matrices, got shape {result.shape}!")
+    return result
+
+
+def identity(shape: tuple = ()) -> np.ndarray:
+    result = np.zeros(tuple(shape) + (3, 3), dtype = np.float64)
+    result[..., 0, 0] = result[..., 1, 1] = result[..., 2, 2] = 1.0
+    return result
+
+
+def translate(t: np.ndarray | list) -> np.ndarray:
+    t = np.asarray(t, dtype = np.float64)
+    result = identity(t.shape[:-1])
+    result[..., 0, 2] = t[..., 0]
+    result[..., 1, 2] = t[..., 1]
+    return result
+
+
+def rotate(r: np.ndarray | float) -> np.ndarray:
+    rad = np.radians(np.asarray(r, dtype = np.float64))
+    cos = np.cos(rad)
+    sin = np.sin(rad)
+    result = identity(rad.shape)
+    result[..., 0, 0] = cos
+    result[..., 0, 1] = -sin
+    result[..., 1, 0] = sin
+    result[..., 1, 1] = cos
+    return result
+
+
+def scale(s: np.ndarray | list) -> np.ndarray:
+    s = np.asarray(s, dtype = np.float64)
+    result = identity(s.shape[:-1])
+    result[..., 0, 0] = s[..., 0]
+    result[..., 1, 1] = s[..., 1]
+    return result
+
+
+def flip(w: float) -> np.ndarray:
+    return compose(translate([w, 0.0]), scale([-1.0, 1.0]))
+
+
+def flop(h: float) -> np.ndarray:
+    return compose(translate([0.0, h]), scale([1.0, -1.0]))
+
+
+def compose(*matrices: np.ndarray) -> np.ndarray:
+    # left to right, every argument can be a single matrix or a stack,
+    # stacks broadcast against each other.
+    result = as_matrices(matrices[0])
+    for m in matrices[1:]:
+        result = np.matmul(result, as_matrices(m))
+    return result
+
+
+def compose_stack(stack: np.ndarray) -> np.ndarray:
+    # reduce the second to last axis of a (..., N, 3, 3) stack in one go
+    stack = as_matrices(stack)
+    result = identity(stack.shape[:-3])
+    for i in range(stack.shape[-3]):
+        result = np.matmul(result, stack[..., i, :, :])
+    return result
+
+
+def calculate(t: np.ndarray | list,
+              r: np.ndarray | float,
+              s: np.ndarray | list,
+              c: np.ndarray | list) -> np.ndarray:
+    c = np.asarray(c, dtype = np.float64)
+    return compose(translate(t), translate(c), scale(s), rotate(r), translate(-c))
+
+
+def transpose(m: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(np.swapaxes(as_matrices(m), -1, -2))
+
+
+def to_44(m: np.ndarray) -> np.ndarray:
+    m = as_matrices(m)
+    result = np.zeros(m.shape[:-2] + (4, 4), dtype = np.float64)
+    index = np.array([0, 1, 3])
+    result[..., index[:, None], index[None, :]] = m
+    result[..., 2, 2] = 1.0
+    return result
+
+
+def transform_vectors(m: np.ndarray, v: np.ndarray) -> np.ndarray:
+    m = as_matrices(m)
+    v = np.asarray(v, dtype = np.float64)
+    return np.einsum("...ij,...j->...i", m, v)
+
+
+def transform_points(m: np.ndarray, points: np.ndarray) -> np.ndarray:
+    # (..., N, 2) points through (..., 3, 3) matrices with perspective divide
+    m = as_matrices(m)
+    points = np.asarray(points, dtype = np.float64)
+    homogeneous = np.concatenate([points, np.ones(points.shape[:-1] + (1,))], axis = -1)
+    mapped = np.matmul(homogeneous, np.swapaxes(m, -1, -2))
+    return mapped[..., :2] / mapped[..., 2:3]
+
+
+def get_corners(w: float,
+                h: float,
+                origin_upperleft: bool = True) -> np.ndarray:
+    if origin_upperleft:
+        return np.array([[0, h], [w, h], [0, 0], [w, 0]], dtype = np.float64)
+    return np.array([[0, 0], [w, 0], [0, h], [w, h]], dtype = np.float64)
+
+
+def to_cornerpin(m: np.ndarray,
+                 w: float,
+                 h: float,
+                 origin_upperleft: bool = True) -> np.ndarray:
+    m = as_matrices(m)
+    corners = transform_points(m[..., None, :, :], get_corners(w, h, origin_upperleft))
+    return corners.reshape(m.shape[:-2] + (8,))
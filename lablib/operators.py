@@ -1,12 +1,17 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
 from copy import deepcopy
+from typing import Any, Iterator
 
 import os
 import re
 
+import numpy as np
 
-@dataclass
+from . import sequences
+
+
+@dataclass(**sequences._DATACLASS_SLOTS)
 class ImageInfo:
     filename: str = None
     origin_x: int = 0
@@ -21,10 +26,10 @@ class ImageInfo:
     timecode: str = "01:00:00:01"
 
 
-@dataclass
+@dataclass(**sequences._DATACLASS_SLOTS)
 class SequenceInfo:
     path: str = None
-    frames: list[str] = field(default_factory = lambda: list([]))
+    frames: sequences.SequenceFrames = field(default_factory = sequences.SequenceFrames)
     frame_start: int = None
     frame_end: int = None
     head: str = None
@@ -32,6 +37,11 @@ class SequenceInfo:
     padding: int = 0
     hash_string: str = None
     format_string: str = None
+    mixed_padding: bool = False
+
+    @property
+    def gaps(self) -> list[tuple[int, int]]:
+        return self.frames.frame_set.gaps()
 
     def _get_file_splits(self, file_name: str) -> None:
         head, ext = os.path.splitext(file_name)
@@ -42,55 +52,146 @@ class SequenceInfo:
         result = int(self.frame_end) - int(self.frame_start) + 1
         return result
 
+    @classmethod
+    def from_scan(cls, scan: sequences.SequenceScan) -> SequenceInfo:
+        return cls(
+            path = scan.path,
+            frames = sequences.SequenceFrames(
+                path = scan.path,
+                format_string = scan.format_string,
+                frame_set = scan.frames
+            ),
+            frame_start = scan.frame_start,
+            frame_end = scan.frame_end,
+            head = scan.head,
+            tail = scan.tail,
+            padding = scan.padding,
+            hash_string = scan.hash_string,
+            format_string = scan.format_string,
+            mixed_padding = scan.mixed_padding
+        )
+
     def compute_all(self,
                 scan_dir: str,
-                return_only_longer: bool = True) -> list:
-        files = os.listdir(scan_dir)
-        sequenced_files = []
-        matched_files = []
-        for f in files:
-            head, tail = os.path.splitext(f)
-            matches = re.findall(r'\d+$', head)
-            if matches:
-                sequenced_files.append(f)
-                matched_files.append(head.replace(matches[0], ""))
-        matched_files = list(set(matched_files))
-
-        results = []
-        for m in matched_files:
-            seq = SequenceInfo()
-            for sf in sequenced_files:
-                if m in sf:
-                    seq.frames.append(
-                        os.path.join(
-                            scan_dir,
-                            sf
-                        ).replace("\\", "/")
-                    )
-
-            head, frame, ext = self._get_file_splits(seq.frames[0])
-            seq.path = os.path.abspath(scan_dir).replace("\\", "/")
-            seq.frame_start = frame
-            seq.frame_end = self._get_file_splits(seq.frames[-1])[1]
-            seq.head = os.path.basename(head)
-            seq.tail = ext
-            seq.padding = len(str(frame))
-            seq.hash_string = "{}#{}".format(os.path.basename(head), ext)
-            seq.format_string = "{}%0{}d{}".format(os.path.basename(head), len(str(frame)), ext)
-            results.append(seq)
-
-        return results
+                return_only_longer: bool = True,
+                index: sequences.SequenceIndex = None) -> list:
+        return [self.from_scan(s) for s in sequences.scan_directory(scan_dir, index)]
     
-    def compute_longest(self, scan_dir: str) -> SequenceInfo:
-        return self.compute_all(scan_dir = scan_dir)[0]
+    def compute_longest(self,
+                        scan_dir: str,
+                        index: sequences.SequenceIndex = None) -> SequenceInfo:
+        return self.compute_all(scan_dir = scan_dir, index = index)[0]
+
+    @classmethod
+    def discover(cls,
+                 root: str,
+                 include: list[str] = None,
+                 exclude: list[str] = None,
+                 max_depth: int = None,
+                 workers: int = 8,
+                 index: sequences.SequenceIndex = None) -> Iterator[SequenceInfo]:
+        for scan in sequences.walk_sequences(root = root,
+                                             include = include,
+                                             exclude = exclude,
+                                             max_depth = max_depth,
+                                             workers = workers,
+                                             index = index):
+            yield cls.from_scan(scan)
+
+
+@dataclass
+class Curve:
+    keys: list[tuple[float, Any]] = field(default_factory = lambda: list([]))
+
+    def __post_init__(self) -> None:
+        self.keys = sorted(((float(f), v) for f, v in self.keys), key = lambda k: k[0])
+        if not self.keys:
+            raise ValueError("Curve needs at least one key!")
+        self._frames = np.array([k[0] for k in self.keys], dtype = np.float64)
+        self._values = np.array([k[1] for k in self.keys], dtype = np.float64)
+
+    @classmethod
+    def is_curve_data(cls, data: Any) -> bool:
+        if isinstance(data, dict):
+            return bool(data)
+        if isinstance(data, list) and data:
+            return all(
+                isinstance(k, dict) and "frame" in k
+                or isinstance(k, (list, tuple)) and len(k) == 2
+                for k in data
+            )
+        return False
+
+    @classmethod
+    def from_data(cls, data: dict | list) -> Curve:
+        # {frame: value}, [{"frame": f, "value": v}] or [[frame, value]]
+        if isinstance(data, dict):
+            return cls(list(data.items()))
+        return cls([
+            (k["frame"], k["value"]) if isinstance(k, dict) else tuple(k)
+            for k in data
+        ])
+
+    def evaluate(self, frames: np.ndarray) -> np.ndarray:
+        frames = np.asarray(frames, dtype = np.float64)
+        if self._values.ndim == 1:
+            return np.interp(frames, self._frames, self._values)
+        return np.stack([
+            np.interp(frames, self._frames, self._values[:, i])
+            for i in range(self._values.shape[1])
+        ], axis = -1)
 
 
 @dataclass
 class RepoTransform:
-    translate: list[float] = field(default_factory = lambda: list([0.0, 0.0]))
-    rotate: float = 0.0
-    scale: list[float] = field(default_factory = lambda: list([0.0, 0.0]))
-    center: list[float] = field(default_factory = lambda: list([0.0, 0.0]))
+    translate: list[float] | Curve = field(default_factory = lambda: list([0.0, 0.0]))
+    rotate: float | Curve = 0.0
+    scale: list[float] | Curve = field(default_factory = lambda: list([0.0, 0.0]))
+    center: list[float] | Curve = field(default_factory = lambda: list([0.0, 0.0]))
+    disable: bool = False
+
+    def is_animated(self) -> bool:
+        return any(
+            isinstance(v, Curve)
+            for v in (self.translate, self.rotate, self.scale, self.center)
+        )
+
+    def get_values(self, frames: np.ndarray) -> tuple[np.ndarray, ...]:
+        frames = np.asarray(frames, dtype = np.float64)
+        result = []
+        for name, value, size in (("translate", self.translate, 2),
+                                  ("rotate", self.rotate, 1),
+                                  ("scale", self.scale, 2),
+                                  ("center", self.center, 2)):
+            if isinstance(value, Curve):
+                value = value.evaluate(frames)
+            else:
+                value = np.broadcast_to(np.asarray(value, dtype = np.float64),
+                                        frames.shape + (() if size == 1 else (size,)))
+            if size == 2 and value.ndim == frames.ndim:
+                if name != "scale":
+                    raise ValueError("{} curve needs x and y values!".format(name))
+                # uniform scale curves carry a single value per key
+                value = np.stack([value, value], axis = -1)
+            result.append(value)
+        return tuple(result)
+
+    def at_frame(self, frame: float) -> RepoTransform:
+        t, r, s, c = self.get_values([frame])
+        return RepoTransform(translate = t[0].tolist(),
+                             rotate = float(r[0]),
+                             scale = s[0].tolist(),
+                             center = c[0].tolist(),
+                             disable = self.disable)
+
+
+@dataclass
+class EffectSegment:
+    frame_start: int = None
+    frame_end: int = None
+    color_operators: list = field(default_factory = lambda: list([]))
+    repo_operators: list = field(default_factory = lambda: list([]))
+    frame_offset: int = 0
 
 
 @dataclass
@@ -98,6 +199,7 @@ class FileTransform:
     src: str = ""
     cccId: str = "0"
     direction: int = 0
+    disable: bool = False
 
 
 @dataclass
@@ -106,12 +208,14 @@ class DisplayViewTransform:
     display: str = "ACES"
     view: str = "Rec.709"
     direction: int = 0
+    disable: bool = False
 
 
 @dataclass
 class ColorSpaceTransform:
     src: str = "ACES - ACEScg"
     dst: str = "ACES - ACEScg"
+    disable: bool = False
 
 
 @dataclass
@@ -124,5 +228,6 @@ class CDLTransform:
     description: str = ""
     id: str = ""
     direction: int = 0
+    disable: bool = False
 
 
@@ -2,11 +2,15 @@ from __future__ import annotations
 
 from typing import Any
 from dataclasses import dataclass, field
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import json
+import hashlib
 import inspect
 import os
+import threading
 import uuid
 import copy
 import shutil
@@ -16,12 +20,174 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 
+import numpy as np
 import PyOpenColorIO as OCIO
 
 from . import (
+    cache,
+    matrices,
     utils,
     operators as ops
 )
+from .sequences import FrameSet
+
+
+def _build_operator_registry() -> dict:
+    # maps the normalized node class name to (operator class, is repo op),
+    # color operators win over repo operators with the same base name.
+    registry = {}
+    for name, member in inspect.getmembers(ops, inspect.isclass):
+        if not name.endswith("Transform"):
+            continue
+        base = name[:-len("Transform")]
+        if base.startswith("Repo"):
+            registry.setdefault(base[len("Repo"):], (member, True))
+        else:
+            registry[base] = (member, False)
+    return registry
+
+
+_OPERATOR_REGISTRY: dict = _build_operator_registry()
+_NODE_CLASSES: dict = dict({})
+_EFFECTS_CACHE: OrderedDict = OrderedDict()
+_EFFECTS_CACHE_SIZE: int = 512
+_EFFECTS_CACHE_LOCK = threading.Lock()
+
+
+def get_operator_class(node_class: str) -> tuple[Any, bool]:
+    result = _NODE_CLASSES.get(node_class)
+    if result is None:
+        base = node_class.replace("OCIO", "").replace("Transform", "")
+        result = _OPERATOR_REGISTRY.get(base, (None, False))
+        _NODE_CLASSES[node_class] = result
+    return result
+
+
+# half of the oiiotool default filter widths, in destination pixels,
+# the native engines build their kernels from the same table
+FILTER_RADII: dict = dict({
+    "box": 0.5,
+    "triangle": 1.0,
+    "cubic": 2.0,
+    "catmull-rom": 2.0,
+    "lanczos3": 3.0,
+    "blackman-harris": 1.5
+})
+_BASE_CONFIGS: dict = dict({})
+_BASE_CONFIGS_LOCK = threading.Lock()
+_CONFIG_CACHE_SIZE: int = 256 * 1024 * 1024
+
+
+def get_base_config(path: str) -> OCIO.Config:
+    # parse every base config once per process, callers get their own copy
+    path = Path(path).resolve().as_posix()
+    signature = cache.stat_signature(path)
+    with _BASE_CONFIGS_LOCK:
+        entry = _BASE_CONFIGS.get(path)
+        if not entry or entry[0] != signature:
+            entry = (signature, OCIO.Config.CreateFromFile(path))
+            _BASE_CONFIGS[path] = entry
+        return copy.deepcopy(entry[1])
+
+
+def evict_config_cache(max_bytes: int = _CONFIG_CACHE_SIZE) -> list[str]:
+    cache_dir = Path(cache.get_cache_dir("configs"))
+    entries = []
+    for entry in os.scandir(cache_dir.as_posix()):
+        if entry.is_file() and entry.name.endswith(".ocio"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total = sum(e[1] for e in entries)
+    removed = []
+    # oldest first, cache hits refresh the mtime
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        removed.append(Path(path).as_posix())
+    return removed
+
+
+def _is_identity_operator(op: Any) -> bool:
+    if isinstance(op, ops.CDLTransform):
+        # only with the unclamped style OCIO v2 builds by default
+        return (list(op.slope) == [1.0, 1.0, 1.0]
+                and list(op.offset) == [0.0, 0.0, 0.0]
+                and list(op.power) == [1.0, 1.0, 1.0]
+                and op.sat == 1.0)
+    if isinstance(op, ops.ColorSpaceTransform):
+        return op.src == op.dst
+    return False
+
+
+def _fuse_cdls(first: ops.CDLTransform,
+               second: ops.CDLTransform) -> ops.CDLTransform:
+    # only fuses when the result is exact, nothing non linear may sit
+    # between the two slope / offset stages.
+    if first.direction or second.direction or first.sat != 1.0:
+        return None
+    if list(second.slope) == [1.0, 1.0, 1.0] and list(second.offset) == [0.0, 0.0, 0.0]:
+        return ops.CDLTransform(
+            offset = list(first.offset),
+            power = [a * b for a, b in zip(first.power, second.power)],
+            slope = list(first.slope),
+            sat = second.sat,
+            description = first.description,
+            id = first.id
+        )
+    if list(first.power) == [1.0, 1.0, 1.0]:
+        return ops.CDLTransform(
+            offset = [o * s + b for o, s, b in zip(first.offset, second.slope, second.offset)],
+            power = list(second.power),
+            slope = [a * b for a, b in zip(first.slope, second.slope)],
+            sat = second.sat,
+            description = first.description,
+            id = first.id
+        )
+    return None
+
+
+def optimize_color_operators(operators: list) -> tuple[list, list[str]]:
+    result = []
+    report = []
+    for i, op in enumerate(operators):
+        name = op.__class__.__name__
+        if getattr(op, "disable", False):
+            report.append(f"Removed disabled {name} at {i}")
+            continue
+        if _is_identity_operator(op):
+            report.append(f"Removed identity {name} at {i}")
+            continue
+        if result:
+            index, previous = result[-1]
+            if isinstance(previous, ops.CDLTransform) and isinstance(op, ops.CDLTransform):
+                fused = _fuse_cdls(previous, op)
+                if fused:
+                    report.append(f"Fused CDLTransform at {i} into {index}")
+                    result.pop()
+                    if _is_identity_operator(fused):
+                        report.append(f"Removed identity CDLTransform at {index}")
+                    else:
+                        result.append((index, fused))
+                    continue
+            if (isinstance(previous, ops.ColorSpaceTransform)
+                    and isinstance(op, ops.ColorSpaceTransform)
+                    and previous.src == op.dst and previous.dst == op.src):
+                report.append("Cancelled ColorSpaceTransform pair at {} and {} ({} -> {})".format(
+                    index, i, previous.src, previous.dst))
+                result.pop()
+                continue
+        result.append((i, op))
+    return [op for _, op in result], report
+
+
+def clear_effects_cache() -> None:
+    with _EFFECTS_CACHE_LOCK:
+        _EFFECTS_CACHE.clear()
 
 
 @dataclass
@@ -53,12 +219,15 @@ class EffectsFileProcessor:
         self._repo_ops = []
 
     def __post_init__(self) -> None:
-        self._wrapper_class_members = dict(inspect.getmembers(ops, inspect.isclass))
-        self._wrapper_class_names = [v for v in self._wrapper_class_members.keys()]
         self._color_ops: list = list([])
         self._repo_ops: list = list([])
+        self._color_windows: list = list([])
+        self._repo_windows: list = list([])
+        self._timeline_start: int = None
         self._class_search_key: str = "class"
         self._index_search_key: str = "subTrackIndex"
+        self._timeline_in_key: str = "timelineIn"
+        self._timeline_out_key: str = "timelineOut"
         self._data_search_key: str = "node"
         self._valid_attrs: tuple = tuple((
             "in_colorspace",
@@ -74,7 +243,14 @@ class EffectsFileProcessor:
             "power",
             "offset",
             "slope",
-            "direction"
+            "direction",
+            "disable"
+        ))
+        self._animated_attrs: tuple = tuple((
+            "translate",
+            "rotate",
+            "scale",
+            "center"
         ))
         self._valid_attrs_mapping: dict = dict({
             "in_colorspace": "src",
@@ -85,26 +261,32 @@ class EffectsFileProcessor:
         if self.src:
             self.load(self.src)
 
+    @classmethod
+    def load_many(cls,
+                  paths: list[str],
+                  workers: int = 8) -> list[EffectsFileProcessor]:
+        paths = list(paths)
+        if not paths:
+            return []
+        with ThreadPoolExecutor(max_workers = min(workers, len(paths))) as pool:
+            return list(pool.map(cls, paths))
+
     def _get_operator_class(self, name: str) -> Any:
-        name = "{}Transform".format(name.replace("OCIO", "").replace("Transform", ""))
-        if name in self._wrapper_class_names:
-            return self._wrapper_class_members[name]
-        elif "Repo{}".format(name) in self._wrapper_class_names:
-            return self._wrapper_class_members["Repo{}".format(name)]
-        else:
-            return None
+        return get_operator_class(name)[0]
 
     def _get_operator_sanitized(self, op: Any, data: dict) -> Any:
         # sanitize for different source data structures.
         # fix for nuke vs ocio, cdl transform should not have a src field by ocio specs
         if "CDL" in op.__name__:
-            del data["src"]
+            data.pop("src", None)
         return op(**data)
 
     def _get_operator(self, data: dict) -> None:
         result = {}
         for k, v in data[self._data_search_key].items():
             if k in self._valid_attrs:
+                if k in self._animated_attrs and ops.Curve.is_curve_data(v):
+                    v = ops.Curve.from_data(v)
                 if k in self._valid_attrs_mapping:
                     result[self._valid_attrs_mapping[k]] = v
                 else:
@@ -114,32 +296,150 @@ class EffectsFileProcessor:
         op = self._get_operator_class(data[self._class_search_key])
         return self._get_operator_sanitized(op = op, data = result)
 
-    def _load(self) -> None:
-        with open(self.src, "r") as f:
-            _ops = json.load(f)
+    def _validate_node(self, name: str, data: dict) -> None:
+        for key in (self._index_search_key, self._data_search_key):
+            if key not in data:
+                raise ValueError(f"Effect '{name}' in '{self.src}' is missing '{key}'!")
+        if not isinstance(data[self._data_search_key], dict):
+            raise ValueError(f"Effect '{name}' in '{self.src}' has an invalid '{self._data_search_key}'!")
+
+    def _parse(self) -> tuple[list, list, list, list]:
+        try:
+            with open(self.src, "r") as f:
+                _ops = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid effects file '{self.src}': {e}!") from e
+        if not isinstance(_ops, dict):
+            raise ValueError(f"Invalid effects file '{self.src}', expected a mapping of effects!")
         ocio_nodes = []
         repo_nodes = []
         for k, v in _ops.items():
-            if isinstance(v, dict):
-                class_name = "{}Transform".format(
-                    v[self._class_search_key].replace("OCIO", "").replace("Transform", "")
-                )
-                if class_name in self._wrapper_class_names:
-                    ocio_nodes.append(v)
-                elif "Repo{}".format(class_name) in self._wrapper_class_names:
-                    repo_nodes.append(v)
-                else:
-                    continue
-        ocio_nodes = sorted(ocio_nodes, key=lambda d: d[self._index_search_key])
-        repo_nodes = sorted(repo_nodes, key=lambda d: d[self._index_search_key])
-        for c in ocio_nodes:
-            self._color_ops.append(self._get_operator(c))
-        for c in repo_nodes:
-            self._repo_ops.append(self._get_operator(c))
+            if not isinstance(v, dict) or self._class_search_key not in v:
+                continue
+            op_class, is_repo = get_operator_class(v[self._class_search_key])
+            if not op_class:
+                continue
+            self._validate_node(k, v)
+            if is_repo:
+                repo_nodes.append((k, v))
+            else:
+                ocio_nodes.append((k, v))
+        parsed = []
+        for nodes in (ocio_nodes, repo_nodes):
+            nodes = sorted(nodes, key=lambda n: n[1][self._index_search_key])
+            operators = []
+            for k, v in nodes:
+                try:
+                    operators.append(self._get_operator(v))
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Effect '{k}' in '{self.src}' is invalid: {e}!") from e
+            parsed.append(operators)
+            parsed.append([self._get_window(v) for _, v in nodes])
+        return tuple(parsed)
+
+    def _load(self) -> None:
+        path = Path(self.src).resolve().as_posix()
+        signature = cache.stat_signature(path)
+        with _EFFECTS_CACHE_LOCK:
+            entry = _EFFECTS_CACHE.get(path)
+            if entry and entry[0] == signature:
+                _EFFECTS_CACHE.move_to_end(path)
+                parsed = entry[1]
+            else:
+                parsed = None
+        if parsed is None:
+            parsed = self._parse()
+            with _EFFECTS_CACHE_LOCK:
+                _EFFECTS_CACHE[path] = (signature, parsed)
+                while len(_EFFECTS_CACHE) > _EFFECTS_CACHE_SIZE:
+                    _EFFECTS_CACHE.popitem(last = False)
+        # hand out copies, cached operators must never be touched by callers
+        color_ops, color_windows, repo_ops, repo_windows = copy.deepcopy(parsed)
+        self._color_ops.extend(color_ops)
+        self._color_windows.extend(color_windows)
+        self._repo_ops.extend(repo_ops)
+        self._repo_windows.extend(repo_windows)
+        timeline_ins = [w[0] for w in self._color_windows + self._repo_windows if w]
+        self._timeline_start = min(timeline_ins) if timeline_ins else None
+
+    def _get_window(self, data: dict) -> tuple[int, int]:
+        start = data.get(self._timeline_in_key)
+        end = data.get(self._timeline_out_key)
+        if start is None or end is None:
+            return None
+        start, end = int(start), int(end)
+        node = data[self._data_search_key]
+        if node.get("useLifetime"):
+            if node.get("lifetimeStart") is not None:
+                start = max(start, int(node["lifetimeStart"]))
+            if node.get("lifetimeEnd") is not None:
+                end = min(end, int(node["lifetimeEnd"]))
+        return start, end
+
+    def get_frame_offset(self,
+                         frame_start: int,
+                         timeline_start: int = None,
+                         handle_start: int = 0) -> int:
+        # the first frame after the head handles sits on the first effect frame
+        if timeline_start is None:
+            timeline_start = self._timeline_start
+        if timeline_start is None:
+            return 0
+        return int(timeline_start) - int(frame_start) - int(handle_start or 0)
+
+    def get_segments(self,
+                     frame_start: int,
+                     frame_end: int,
+                     timeline_start: int = None,
+                     handle_start: int = 0,
+                     extend_handles: bool = True) -> list[ops.EffectSegment]:
+        offset = self.get_frame_offset(frame_start, timeline_start, handle_start)
+        windows = [
+            [w[0] - offset, w[1] - offset] if w else None
+            for w in self._color_windows + self._repo_windows
+        ]
+        if extend_handles and any(windows):
+            # effects covering the cut edges are held over the handles,
+            # only effects starting or ending inside the cut stay limited.
+            first = min(w[0] for w in windows if w)
+            last = max(w[1] for w in windows if w)
+            for w in windows:
+                if w and w[0] == first:
+                    w[0] = min(w[0], frame_start)
+                if w and w[1] == last:
+                    w[1] = max(w[1], frame_end)
+        bounds = set([frame_start, frame_end + 1])
+        for w in windows:
+            if w:
+                bounds.update(b for b in (w[0], w[1] + 1) if frame_start < b <= frame_end)
+        bounds = sorted(bounds)
+        color_count = len(self._color_ops)
+        segments = []
+        active_sets = []
+        for start, end in zip(bounds, bounds[1:]):
+            active = tuple(
+                i for i, w in enumerate(windows)
+                if not w or w[0] <= start <= w[1]
+            )
+            if segments and active_sets[-1] == active:
+                segments[-1].frame_end = end - 1
+                continue
+            active_sets.append(active)
+            segments.append(ops.EffectSegment(
+                frame_start = start,
+                frame_end = end - 1,
+                color_operators = [self._color_ops[i] for i in active if i < color_count],
+                repo_operators = [self._repo_ops[i - color_count] for i in active if i >= color_count],
+                frame_offset = offset
+            ))
+        return segments
 
     def clear_operators(self) -> None:
-        self.color_ops = []
-        self.repo_ops = []
+        self._color_ops = []
+        self._repo_ops = []
+        self._color_windows = []
+        self._repo_windows = []
+        self._timeline_start = None
 
     def load(self, src: str) -> None:
         self.src = src
@@ -173,8 +473,18 @@ class ColorProcessor:
         self._ocio_config: OCIO.Config = None
         self._ocio_transforms: list = list([])
         self._ocio_search_paths: list = list([])
+        self._search_paths: list = list([])
         self._ocio_config_name: str = "config.ocio"
         self._dest_path: str = None
+        self._bake: bool = False
+        self._bake_size: int = 129
+        self._bake_shaper_range: tuple[float, float] = (-8.0, 8.0)
+        self._lut_path: str = None
+        self._use_config_cache: bool = True
+        self._config_cache_size: int = _CONFIG_CACHE_SIZE
+        self._config_cached: bool = False
+        self._optimize: bool = True
+        self._optimization_report: list[str] = list([])
         
 
     # @property
@@ -218,6 +528,39 @@ class ColorProcessor:
 
     def set_staging_dir(self, path: str) -> None:
         self.staging_dir = Path(path).resolve().as_posix()
+
+    def set_config_cache(self,
+                         enabled: bool = True,
+                         max_bytes: int = None) -> None:
+        self._use_config_cache = enabled
+        if max_bytes:
+            self._config_cache_size = max_bytes
+
+    def set_optimize(self, optimize: bool = True) -> None:
+        self._optimize = optimize
+
+    def get_optimized_operators(self) -> list:
+        if not self._optimize:
+            self._optimization_report = []
+            return [op for op in self.operators if not getattr(op, "disable", False)]
+        operators, self._optimization_report = optimize_color_operators(self.operators)
+        return operators
+
+    def get_optimization_report(self) -> list[str]:
+        return self._optimization_report
+
+    def is_config_cached(self) -> bool:
+        return self._config_cached
+
+    def set_bake(self,
+                 bake: bool = True,
+                 size: int = None,
+                 shaper_range: tuple[float, float] = None) -> None:
+        self._bake = bake
+        if size:
+            self._bake_size = size
+        if shaper_range:
+            self._bake_shaper_range = tuple(shaper_range)
     
     def set_views(self, *args: str | list[str]) -> None:
         self.clear_views()
@@ -303,15 +646,18 @@ class ColorProcessor:
         return self._sanitize_search_paths(paths)
 
     def _read_config(self) -> None:
-        self._ocio_config = OCIO.Config.CreateFromFile(self.config_path)
+        self._ocio_config = get_base_config(self.config_path)
 
     def load_config_from_file(self, src: str) -> None:
         self.config_path = src
         self._read_config()
 
-    def process_config(self) -> None:
-        for op in self.operators:
-            props = vars(op)
+    def _get_ocio_transforms(self) -> list:
+        transforms = []
+        for op in self.get_optimized_operators():
+            # work on a copy, operators can be shared between processors
+            props = dict(vars(op))
+            props.pop("disable", None)
             if props.get("direction"):
                 props["direction"] = OCIO.TransformDirection.TRANSFORM_DIR_INVERSE
             else:
@@ -321,28 +667,61 @@ class ColorProcessor:
                 op_path = Path(props["src"]).resolve()
                 if op_path.is_file():
                     props["src"] = op_path.name
-            self._ocio_transforms.append(ocio_class_name(**props))
+            transforms.append(ocio_class_name(**props))
+        return transforms
+
+    def _get_context_colorspace(self) -> OCIO.ColorSpace:
+        cspace = OCIO.ColorSpace()
+        cspace.setName(self.context)
+        cspace.setFamily(self.family)
+        cspace.setTransform(
+            OCIO.GroupTransform(self._ocio_transforms),
+            OCIO.ColorSpaceDirection.COLORSPACE_DIR_FROM_REFERENCE
+        )
+        return cspace
+
+    def _get_resolved_config(self) -> OCIO.Config:
+        # copy of the working config with absolute search paths, so file
+        # transforms resolve without a config written to disk
+        config = copy.deepcopy(self._ocio_config)
+        config.clearSearchPaths()
+        for sp in self._search_paths:
+            config.addSearchPath(sp)
+        return config
+
+    def get_processor(self) -> OCIO.Processor:
+        self.load_config_from_file(Path(self.config_path).resolve().as_posix())
+        self._get_absolute_search_paths()
+        self._ocio_transforms = self._get_ocio_transforms()
+        for k, v in self._vars.items():
+            self._ocio_config.addEnvironmentVar(k, v)
+        self._ocio_config.addColorSpace(self._get_context_colorspace())
+        if self._bake:
+            lut_path = self.bake_lut()
+            return self._get_resolved_config().getProcessor(
+                self._get_baked_transform(lut_path))
+        return self._get_resolved_config().getProcessor(self.working_space, self.context)
+
+    def process_config(self) -> None:
+        self._ocio_transforms = self._get_ocio_transforms()
         for k, v in self._vars.items():
             self._ocio_config.addEnvironmentVar(k, v)
         self._ocio_config.setDescription(self._description)
-        group_transform = OCIO.GroupTransform(self._ocio_transforms)
         look_transform = OCIO.ColorSpaceTransform(
             src = self.working_space,
             dst = self.context
         )
-        cspace = OCIO.ColorSpace()
-        cspace.setName(self.context)
-        cspace.setFamily(self.family)
-        cspace.setTransform(
-            group_transform,
-            OCIO.ColorSpaceDirection.COLORSPACE_DIR_FROM_REFERENCE
-        )
+        cspace = self._get_context_colorspace()
+        if self._bake:
+            self._ocio_config.addColorSpace(cspace)
+            look_transform = self._get_baked_transform(self.bake_lut())
         look = OCIO.Look(
             name = self.context,
             processSpace = self.working_space,
             transform = look_transform
         )
-        self._ocio_config.addColorSpace(cspace)
+        if not self._bake:
+            self._ocio_config.addColorSpace(cspace)
         self._ocio_config.addLook(look)
         self._ocio_config.addDisplayView(
             self._ocio_config.getActiveDisplays().split(",")[0],
@@ -358,9 +737,105 @@ class ColorProcessor:
                 "{},{}".format(self.context, ",".join(self._views)))
         self._ocio_config.validate()
 
+    def _get_shaper_transform(self, inverse: bool = False) -> OCIO.AllocationTransform:
+        # log2 allocation so the lattice spends its points evenly per stop,
+        # the offset keeps zero at the bottom of the range. Cells are linear
+        # in log space, so the bake carries a relative error that is about
+        # the same in every stop: within 2e-3 of the unbaked chain for a CDL
+        # graded in ACEScct at the default -8..8 range and size 129, about
+        # 6e-3 at size 65. Values outside the range are clipped, narrow it
+        # to the footage through set_bake to spend the lattice on fewer stops.
+        low, high = self._bake_shaper_range
+        return OCIO.AllocationTransform(
+            allocation = OCIO.Allocation.ALLOCATION_LG2,
+            vars = [low, high, 2.0 ** low],
+            direction = OCIO.TransformDirection.TRANSFORM_DIR_INVERSE if inverse
+                else OCIO.TransformDirection.TRANSFORM_DIR_FORWARD
+        )
+
+    def _get_baked_transform(self, lut_path: str) -> OCIO.GroupTransform:
+        return OCIO.GroupTransform([
+            self._get_shaper_transform(),
+            OCIO.FileTransform(
+                src = Path(lut_path).name,
+                interpolation = OCIO.Interpolation.INTERP_TETRAHEDRAL
+            )
+        ])
+
+    def _get_canonical_operators(self) -> list:
+        operators = []
+        for op in self.operators:
+            props = dict(vars(op))
+            if props.get("src") and Path(props["src"]).resolve().is_file():
+                # key referenced files by content, shots sharing a grade
+                # from different locations still share the same hash
+                props["src"] = hashlib.blake2b(
+                    Path(props["src"]).resolve().read_bytes(),
+                    digest_size = 16
+                ).hexdigest()
+            operators.append([op.__class__.__name__, props])
+        return operators
+
+    def get_chain_hash(self) -> str:
+        # content addressed, stays the same when configs and grades move
+        digest = hashlib.blake2b(digest_size = 16)
+        digest.update(Path(self.config_path).resolve().read_bytes())
+        digest.update(json.dumps({
+            "operators": self._get_canonical_operators(),
+            "vars": self._vars,
+            "context": self.context,
+            "working_space": self.working_space,
+            "optimize": self._optimize,
+            "bake": [self._bake, self._bake_size, self._bake_shaper_range]
+        }, sort_keys = True, default = str).encode())
+        return digest.hexdigest()
+
+    def get_lut_hash(self) -> str:
+        digest = hashlib.blake2b(digest_size = 16)
+        digest.update(Path(self.config_path).resolve().read_bytes())
+        digest.update(json.dumps({
+            "operators": self._get_canonical_operators(),
+            # context vars and search paths decide which files the chain resolves
+            "vars": self._vars,
+            "search_paths": sorted(
+                p for p in self._search_paths if p != cache.get_cache_dir("luts")),
+            "working_space": self.working_space,
+            "optimize": self._optimize,
+            "size": self._bake_size,
+            "shaper_range": self._bake_shaper_range
+        }, sort_keys = True, default = str).encode())
+        return digest.hexdigest()
+
+    def bake_lut(self) -> str:
+        lut_path = Path(cache.get_cache_dir("luts"), "{}.cube".format(self.get_lut_hash()))
+        self._lut_path = lut_path.as_posix()
+        if not lut_path.is_file():
+            self._write_lut(lut_path)
+        if lut_path.parent.as_posix() not in self._search_paths:
+            self._search_paths.append(lut_path.parent.as_posix())
+        return self._lut_path
+
+    def _write_lut(self, dest: Path) -> None:
+        processor = self._get_resolved_config().getProcessor(OCIO.GroupTransform([
+            self._get_shaper_transform(inverse = True),
+            OCIO.ColorSpaceTransform(src = self.working_space, dst = self.context)
+        ])).getDefaultCPUProcessor()
+        size = self._bake_size
+        grid = np.linspace(0.0, 1.0, size, dtype = np.float32)
+        # .cube lattices are written with red changing fastest
+        b, g, r = np.meshgrid(grid, grid, grid, indexing = "ij")
+        lattice = np.ascontiguousarray(np.stack([r, g, b], axis = -1).reshape(-1, 3))
+        processor.apply(OCIO.PackedImageDesc(lattice, lattice.shape[0], 1, 3))
+        tmp_path = dest.with_name("{}.{}.tmp".format(dest.name, uuid.uuid4().hex))
+        with open(tmp_path.as_posix(), "w") as f:
+            f.write("TITLE \"{}\"\n".format(self.context))
+            f.write("LUT_3D_SIZE {}\n".format(size))
+            np.savetxt(f, lattice, fmt = "%.7f")
+        os.replace(tmp_path.as_posix(), dest.as_posix())
+
     def write_config(self, dest: str = None) -> str:
         config_lines = self._ocio_config.serialize().splitlines()
-        search_paths = self._search_paths
+        search_paths = list(self._search_paths)
         for i, sp in enumerate(search_paths):
             search_paths[i] = "  - {}".format(sp)
         for i, l in enumerate(copy.deepcopy(config_lines)):
@@ -377,13 +852,52 @@ class ColorProcessor:
             f.write(final_config)
         return final_config
 
+    def get_config_hash(self) -> str:
+        digest = hashlib.blake2b(digest_size = 16)
+        digest.update(Path(self.config_path).resolve().read_bytes())
+        operators = []
+        for op in self.operators:
+            props = dict(vars(op))
+            if props.get("src") and Path(props["src"]).resolve().is_file():
+                props["stat"] = cache.stat_signature(Path(props["src"]).resolve().as_posix())
+            operators.append([op.__class__.__name__, props])
+        digest.update(json.dumps({
+            "config_path": Path(self.config_path).resolve().as_posix(),
+            "operators": operators,
+            "vars": self._vars,
+            "views": self._views,
+            "description": self._description,
+            "context": self.context,
+            "family": self.family,
+            "optimize": self._optimize,
+            "working_space": self.working_space,
+            "bake": [self._bake, self._bake_size, self._bake_shaper_range]
+        }, sort_keys = True, default = str).encode())
+        return digest.hexdigest()
+
     def create_config(self, dest: str = None) -> None:
-        if not dest: dest = Path(self.staging_dir, self._ocio_config_name)
+        self._config_cached = not dest and self._use_config_cache
+        if self._config_cached:
+            dest = Path(cache.get_cache_dir("configs"),
+                        "{}.ocio".format(self.get_config_hash()))
+            if dest.is_file():
+                # refresh the mtime, eviction drops the oldest configs first
+                os.utime(dest.as_posix())
+                self._dest_path = dest.as_posix()
+                return self._dest_path
+        elif not dest:
+            dest = Path(self.staging_dir, self._ocio_config_name)
         dest = Path(dest).resolve().as_posix()
         self.load_config_from_file(Path(self.config_path).resolve().as_posix())
         self._get_absolute_search_paths()
         self.process_config()
-        self.write_config(dest)
+        if self._config_cached:
+            tmp_path = "{}.{}.tmp".format(dest, uuid.uuid4().hex)
+            self.write_config(tmp_path)
+            os.replace(tmp_path, dest)
+            evict_config_cache(self._config_cache_size)
+        else:
+            self.write_config(dest)
         self._dest_path = dest
         return dest
     
@@ -409,6 +923,9 @@ class RepoProcessor:
     def __post_init__(self):
          self._raw_matrix: list[list[float]] = list([list([])])
          self._class_search_key = "class"
+         self._frame_offset: int = 0
+         self._fused: bool = False
+         self._fused_filter: str = "cubic"
 
     def set_source_size(self, width: int, height: int) -> None:
         self.source_width = width
@@ -418,6 +935,20 @@ class RepoProcessor:
         self.dest_width = width
         self.dest_height = height
 
+    def set_frame_offset(self, offset: int) -> None:
+        self._frame_offset = offset
+
+    def set_fused(self, fused: bool = True, filter: str = None) -> None:
+        self._fused = fused
+        if filter:
+            self._fused_filter = filter
+
+    def is_fused(self) -> bool:
+        return self._fused
+
+    def get_fused_filter(self) -> str:
+        return self._fused_filter
+
     def get_raw_matrix(self) -> list[list[float]]:
         return self._raw_matrix
 
@@ -428,12 +959,19 @@ class RepoProcessor:
             else:
                 self.operators.append(a)
 
+    def _get_active_operators(self) -> list:
+        return [op for op in self.operators if not op.disable]
+
+    def is_animated(self) -> bool:
+        return any(op.is_animated() for op in self._get_active_operators())
+
     def get_matrix_chained(self,
                            flip: bool = False,
                            flop: bool = True,
-                           reverse_chain: bool = True) -> str:
+                           reverse_chain: bool = True,
+                           frame: int = None) -> str:
         chain = []
-        tlist = self.operators
+        tlist = self._get_active_operators()
         if reverse_chain:
             tlist.reverse()
         if flip:
@@ -441,6 +979,10 @@ class RepoProcessor:
         if flop:
             chain.append(utils.flop_matrix(self.source_height))
         for xform in tlist:
+            if xform.is_animated():
+                # without a frame, curves hold their first key
+                xform = xform.at_frame(float("-inf") if frame is None
+                                       else frame + self._frame_offset)
             chain.append(utils.calculate_matrix(t = xform.translate,
                                                 r = xform.rotate,
                                                 s = xform.scale,
@@ -455,6 +997,43 @@ class RepoProcessor:
         self._raw_matrix = result
         return result
 
+    def get_matrices_chained(self,
+                             frames: list[int],
+                             flip: bool = False,
+                             flop: bool = True,
+                             reverse_chain: bool = True) -> np.ndarray:
+        frames = np.asarray(list(frames), dtype = np.float64) + self._frame_offset
+        tlist = self._get_active_operators()
+        if reverse_chain:
+            tlist.reverse()
+        chain = [matrices.identity(frames.shape)]
+        if flip:
+            chain.append(matrices.flip(self.source_width))
+        if flop:
+            chain.append(matrices.flop(self.source_height))
+        for xform in tlist:
+            chain.append(matrices.calculate(*xform.get_values(frames)))
+        if flop:
+            chain.append(matrices.flop(self.source_height))
+        if flip:
+            chain.append(matrices.flip(self.source_width))
+        return matrices.compose(*chain)
+
+    def get_frame_groups(self,
+                         frames: list[int],
+                         decimals: int = 9) -> list[tuple[FrameSet, list[list[float]]]]:
+        frames = list(frames)
+        matrix_stack = self.get_matrices_chained(frames)
+        keys = np.round(matrix_stack, decimals) + 0.0
+        groups = {}
+        for i, frame in enumerate(frames):
+            groups.setdefault(keys[i].tobytes(), []).append(i)
+        return [
+            (FrameSet.from_frames(frames[i] for i in indices),
+             matrix_stack[indices[0]].tolist())
+            for indices in groups.values()
+        ]
+
     def get_cornerpin_data(self,
                            matrix: list[list[float]]) -> list:
         cp = utils.matrix_to_cornerpin(m = matrix,
@@ -463,22 +1042,10 @@ class RepoProcessor:
                                        origin_upperleft = False)
         return cp
 
-    def get_oiiotool_cmd(self) -> list:
-
-        if not self.source_width:
-            raise ValueError(f"Missing source width!")
-        if not self.source_height:
-            raise ValueError(f"Missing source height!")
-        if not self.dest_width:
-            raise ValueError(f"Missing destination width!")
-        if not self.dest_height:
-            raise ValueError(f"Missing destination height!")
-        
-        matrix = self.get_matrix_chained()
-        matrix_tr = utils.transpose_matrix(matrix)
-        warp_cmd = utils.matrix_to_csv(matrix_tr)
-        
-        src_aspect = self.source_width /self.source_height
+    def get_fit_area(self) -> tuple[int, int, int, int]:
+        # source plate padded to the destination aspect, as
+        # (width, height, x offset, y offset)
+        src_aspect = self.source_width / self.source_height
         dest_aspect = self.dest_width / self.dest_height
         
         fitted_width = self.source_width
@@ -493,7 +1060,75 @@ class RepoProcessor:
         elif src_aspect < dest_aspect:
             fitted_width = int(self.source_height * dest_aspect)
             x_offset = int((fitted_width-self.source_width)/2)
+        return fitted_width, fitted_height, x_offset, y_offset
+
+    def get_output_matrix(self, matrix: list[list[float]] = None) -> list[list[float]]:
+        # source pixels straight to destination pixels, the aspect fit
+        # and the resize folded in after the chain
+        if matrix is None:
+            matrix = self.get_matrix_chained()
+        fitted_width, fitted_height, x_offset, y_offset = self.get_fit_area()
+        return matrices.compose(
+            matrices.scale([self.dest_width / fitted_width,
+                            self.dest_height / fitted_height]),
+            matrices.translate([x_offset, y_offset]),
+            matrix
+        ).tolist()
+
+    def get_source_roi(self, matrix: list[list[float]] = None) -> tuple[int, int, int, int]:
+        # source area that reaches the output, as (x, y, width, height)
+        if matrix is None:
+            matrix = self.get_matrix_chained()
+        if self._fused:
+            warp_matrix = np.asarray(self.get_output_matrix(matrix))
+            width, height = self.dest_width, self.dest_height
+            radius = FILTER_RADII.get(self._fused_filter, 3.0)
+        else:
+            width, height, x_offset, y_offset = self.get_fit_area()
+            warp_matrix = matrices.compose(matrices.translate([x_offset, y_offset]), matrix)
+            radius = FILTER_RADII["cubic"]
+        inverse = np.linalg.inv(warp_matrix)
+        corners = matrices.transform_points(inverse, matrices.get_corners(width, height))
+        # pad by the filter radius, widened when the warp minifies
+        footprint = max(1.0, float(np.linalg.norm(inverse[:2, :2], axis = 0).max()))
+        pad = radius * footprint + 1.0
+        x0 = max(0, int(np.floor(corners[:, 0].min() - pad)))
+        y0 = max(0, int(np.floor(corners[:, 1].min() - pad)))
+        x1 = min(self.source_width, int(np.ceil(corners[:, 0].max() + pad)))
+        y1 = min(self.source_height, int(np.ceil(corners[:, 1].max() + pad)))
+        return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+    def get_roi_cmd(self, matrix: list[list[float]] = None) -> list:
+        x, y, width, height = self.get_source_roi(matrix)
+        if (x, y, width, height) == (0, 0, self.source_width, self.source_height):
+            return []
+        if not width or not height:
+            # nothing of the plate is visible, a single pixel keeps the chain valid
+            x, y, width, height = 0, 0, 1, 1
+        return [
+            "--crop", "{}x{}+{}+{}".format(width, height, x, y)
+        ]
+
+    def get_oiiotool_cmd(self, matrix: list[list[float]] = None) -> list:
+
+        if not self.source_width:
+            raise ValueError(f"Missing source width!")
+        if not self.source_height:
+            raise ValueError(f"Missing source height!")
+        if not self.dest_width:
+            raise ValueError(f"Missing destination width!")
+        if not self.dest_height:
+            raise ValueError(f"Missing destination height!")
         
+        if matrix is None:
+            matrix = self.get_matrix_chained()
+        if self._fused:
+            return self._get_fused_oiiotool_cmd(matrix)
+        matrix_tr = utils.transpose_matrix(matrix)
+        warp_cmd = utils.matrix_to_csv(matrix_tr)
+
+        fitted_width, fitted_height, x_offset, y_offset = self.get_fit_area()
+
         cropped_area = "{}x{}-{}-{}".format(fitted_width, fitted_height, x_offset, y_offset)
         dest_size = "{}x{}".format(self.dest_width, self.dest_height)
 
@@ -510,6 +1145,21 @@ class RepoProcessor:
 
         return cmd
 
+    def _get_fused_oiiotool_cmd(self, matrix: list[list[float]]) -> list:
+        # a single warp straight to the destination resolution, oiiotool
+        # widens the filter footprint by the warp derivatives when minifying
+        output_matrix = self.get_output_matrix(matrix)
+        warp_cmd = utils.matrix_to_csv(utils.transpose_matrix(output_matrix))
+        dest_area = "{}x{}+0+0".format(self.dest_width, self.dest_height)
+        return [
+            "--warp:filter={}:recompute_roi=1".format(self._fused_filter),
+            warp_cmd,
+            "--crop",
+            dest_area,
+            "--fullsize",
+            dest_area
+        ]
+
 
 @dataclass
 class SlateProcessor:
@@ -577,7 +1227,7 @@ class SlateProcessor:
     
     def set_staging_dir(self, path: str) -> None:
         self.staging_dir = Path(path).resolve().as_posix()
-    
+
     def set_data(self, data: dict) -> None:
         self.data = data
 
@@ -1,14 +1,25 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import hashlib
+import platform
 import subprocess
 import shutil
 
 from pathlib import Path
 
+from . import cache
 from .utils import read_image_info, offset_timecode
 from .processors import ColorProcessor, RepoProcessor, SlateProcessor
-from .operators import SequenceInfo
+from .operators import SequenceInfo, EffectSegment
+from .sequences import FrameSet, SequenceIndex
 
 
 @dataclass
@@ -24,6 +35,26 @@ class DefaultRenderer:
         self._debug: bool = False
         self._threads: int = 4
         self._command: list = []
+        self._commands: list[list] = list([])
+        self._sequence_index: SequenceIndex = None
+        self._segments: list[EffectSegment] = list([])
+        self._workers: int = None
+        self._chunks: int = None
+        self._retries: int = 0
+        self._autotune: bool = False
+        self._autotune_max_rss: int = None
+        self._autotune_results: list[dict] = list([])
+        self._autotune_frames: int = 24
+        self._autotune_frames_per_process: int = 3
+        self._use_roi: bool = True
+        self._autotile: int = 256
+        self._incremental: bool = True
+        self._manifest: cache.RenderManifest = None
+        self._frame_records: dict[int, dict] = {}
+        self._compression: str = None
+        self._render_cache: cache.RenderCache = None
+        self._cache_keys: dict[int, str] = {}
+        self._frames: FrameSet = None
         if not self.name:
             self.name = "lablib_render"
     
@@ -53,24 +84,124 @@ class DefaultRenderer:
     def set_threads(self, threads: int) -> None:
         self._threads = threads
 
+    def set_sequence_index(self, index: SequenceIndex) -> None:
+        self._sequence_index = index
+
+    def set_segments(self, segments: list[EffectSegment]) -> None:
+        self._segments = list(segments or [])
+
+    def set_workers(self, workers: int) -> None:
+        self._workers = workers
+
+    def set_chunks(self, chunks: int, retries: int = None) -> None:
+        self._chunks = chunks
+        if retries is not None:
+            self._retries = retries
+
+    def set_retries(self, retries: int) -> None:
+        self._retries = retries
+
+    def set_autotune(self,
+                     autotune: bool = True,
+                     max_rss: int = None,
+                     calibration_frames: int = None) -> None:
+        # max_rss caps the summed peak memory of concurrent processes, bytes
+        self._autotune = autotune
+        self._autotune_max_rss = max_rss
+        if calibration_frames:
+            self._autotune_frames = calibration_frames
+
+    def get_autotune_results(self) -> list[dict]:
+        return self._autotune_results
+
+    def set_use_roi(self, use_roi: bool = True) -> None:
+        self._use_roi = use_roi
+
+    def set_incremental(self, incremental: bool = True) -> None:
+        # off renders every frame again, the manifest is still rewritten
+        self._incremental = incremental
+
+    def set_frames(self, frames: FrameSet | list[int] = None) -> None:
+        # explicit frames to render, e.g. FingerprintIndex.update() results
+        if frames is not None and not isinstance(frames, FrameSet):
+            frames = FrameSet.from_frames(frames)
+        self._frames = frames
+
+    def set_compression(self, compression: str) -> None:
+        self._compression = compression
+
+    def set_render_cache(self, render_cache: cache.RenderCache | bool = True) -> None:
+        if render_cache is True:
+            render_cache = cache.RenderCache()
+        self._render_cache = render_cache or None
+
+    def get_render_cache(self) -> cache.RenderCache:
+        return self._render_cache
+
+    def get_manifest(self) -> cache.RenderManifest:
+        return self._manifest
+
     def get_oiiotool_cmd(self) -> list:
         return self._command
 
-    def render(self) -> SequenceInfo:
-        if not self.color_proc and not self.repo_proc:
-            raise ValueError("Missing both valid Processors!")
-        self.setup_staging_dir()
-        cmd = [
-            "oiiotool",
+    def get_oiiotool_cmds(self) -> list[list]:
+        return self._commands
+
+    def _get_dest_path(self) -> str:
+        if self.format:
+            dest_path = "{}{}{}".format(
+                self.source_sequence.head,
+                "#",
+                ".{}".format(self.format) if self.format.find(".") < 0 else self.format
+            )
+        else:
+            dest_path = self.source_sequence.hash_string
+        return Path(
+            self.staging_dir,
+            self.name,
+            dest_path
+        ).resolve().as_posix()
+
+    def _get_dest_frame_path(self, frame: int) -> str:
+        # oiiotool expands a single '#' to four digits
+        head, tail = self._get_dest_path().rsplit("#", 1)
+        return "{}{:04d}{}".format(head, frame, tail)
+
+    def _get_manifest_path(self) -> str:
+        return Path(self.staging_dir, self.name, ".lablib_manifest.json").resolve().as_posix()
+
+    def _get_oiiotool_cmd(self,
+                          frames: FrameSet = None,
+                          repo_matrix: list[list[float]] = None,
+                          color_proc: ColorProcessor = None,
+                          repo_proc: RepoProcessor = None) -> list:
+        color_proc = color_proc or self.color_proc
+        repo_proc = repo_proc or self.repo_proc
+        roi_cmd = []
+        if repo_proc and self._use_roi:
+            roi_cmd = repo_proc.get_roi_cmd(matrix = repo_matrix)
+        cmd = ["oiiotool"]
+        if frames:
+            cmd.extend([
+                "--frames", frames.to_spec()
+            ])
+        if roi_cmd:
+            # autotiled cache reads only pull the cropped scanlines / tiles
+            cmd.extend([
+                "--autotile", str(self._autotile)
+            ])
+        cmd.extend([
             "-i", Path(self.source_sequence.path,
                        self.source_sequence.hash_string).resolve().as_posix(),
+        ])
+        cmd.extend(roi_cmd)
+        cmd.extend([
             "--threads", str(self._threads),
-        ]
-        if self.repo_proc:
-            cmd.extend(self.repo_proc.get_oiiotool_cmd())
-        if self.color_proc:
-            self.color_proc.create_config()
-            cmd.extend(self.color_proc.get_oiiotool_cmd())
+        ])
+        if repo_proc:
+            cmd.extend(repo_proc.get_oiiotool_cmd(matrix = repo_matrix))
+        if color_proc:
+            cmd.extend(color_proc.get_oiiotool_cmd())
         cmd.extend([
             "--ch", "R,G,B"
         ])
@@ -78,29 +209,373 @@ class DefaultRenderer:
             cmd.extend([
                 "--debug", "-v"
             ])
-        if self.format:
-            dest_path = "{}{}{}".format(
-                self.source_sequence.head,
-                "#",
-                ".{}".format(self.format) if self.format.find(".") < 0 else self.format
-            )
-        else:
-            dest_path = self.source_sequence.hash_string
+        if self._compression:
+            cmd.extend([
+                "--compression", self._compression
+            ])
         cmd.extend([
-            "-o", Path(
-                self.staging_dir,
-                self.name,
-                dest_path
-            ).resolve().as_posix()
+            "-o", self._get_dest_path()
         ])
-        self._command = cmd
-        if self._debug:
-            print("oiiotool cmd >>> {}".format(" ".join(self._command)))
-        subprocess.run(cmd)
+        return cmd
+
+    def _get_segment_processors(self,
+                                index: int,
+                                segment: EffectSegment) -> tuple:
+        color_proc = self.color_proc
+        repo_proc = self.repo_proc
+        if color_proc:
+            color_proc = copy.copy(color_proc)
+            color_proc.set_operators(segment.color_operators)
+            color_proc.set_ocio_config_name("{}_{}.ocio".format(
+                Path(self.color_proc._ocio_config_name).stem, index))
+        if repo_proc:
+            repo_proc = copy.copy(repo_proc)
+            repo_proc.operators = list(segment.repo_operators)
+            repo_proc.set_frame_offset(segment.frame_offset)
+        return color_proc, repo_proc
+
+    def _get_jobs(self) -> list[tuple]:
+        frame_set = self.source_sequence.frames.frame_set
+        if not self._segments:
+            if self.color_proc:
+                self.color_proc.create_config()
+            segments = [(None, self.color_proc, self.repo_proc)]
+        else:
+            segments = []
+            for i, segment in enumerate(self._segments):
+                frames = FrameSet.from_frames(
+                    f for f in frame_set
+                    if segment.frame_start <= f <= segment.frame_end)
+                if not frames:
+                    continue
+                color_proc, repo_proc = self._get_segment_processors(i, segment)
+                if color_proc:
+                    color_proc.create_config()
+                segments.append((frames, color_proc, repo_proc))
+        jobs = []
+        for frames, color_proc, repo_proc in segments:
+            if repo_proc and repo_proc.is_animated():
+                # one command per distinct matrix, each limited to its frames
+                jobs.extend(
+                    (group_frames, matrix, color_proc, repo_proc)
+                    for group_frames, matrix in repo_proc.get_frame_groups(
+                        frames if frames else frame_set)
+                )
+            else:
+                jobs.append((frames, None, color_proc, repo_proc))
+        return jobs
+
+    def _split_jobs(self, jobs: list[tuple]) -> list[tuple]:
+        # contiguous chunks of roughly the same size across all jobs
+        frame_set = self.source_sequence.frames.frame_set
+        total = sum(len(job[0] or frame_set) for job in jobs)
+        size = max(1, -(-total // self._chunks))
+        return [
+            (chunk,) + tuple(job[1:])
+            for job in jobs
+            for chunk in (job[0] or frame_set).split(size)
+        ]
+
+    def _cleanup_configs(self, jobs: list[tuple]) -> None:
+        # configs living in the shared cache are kept for the next render
+        config_paths = set(
+            job[2]._dest_path for job in jobs
+            if job[2] and job[2]._dest_path and not job[2].is_config_cached())
+        for config_path in config_paths:
+            Path(config_path).resolve().unlink(missing_ok = True)
+
+    def _get_job_record(self, job: tuple) -> dict:
+        _, matrix, color_proc, repo_proc = job
+        pipeline = {
+            "color": color_proc.get_config_hash() if color_proc else None,
+            "repo": repo_proc.get_oiiotool_cmd(matrix = matrix) if repo_proc else None,
+            "format": self.format
+        }
+        # threads and debug output don't change the pixels, the config path
+        # is replaced by its content hash so staging dirs can move around.
+        cmd = self._get_oiiotool_cmd(None, matrix, color_proc, repo_proc)
+        config_path = color_proc._dest_path if color_proc else None
+        skip = {"--threads": 2, "--debug": 1, "-v": 1}
+        command, i = [], 0
+        while i < len(cmd):
+            if cmd[i] in skip:
+                i += skip[cmd[i]]
+                continue
+            command.append(pipeline["color"] if config_path and cmd[i] == config_path else cmd[i])
+            i += 1
+        return {
+            "pipeline": hashlib.blake2b(
+                json.dumps(pipeline, sort_keys = True, default = str).encode(),
+                digest_size = 16).hexdigest(),
+            "command": hashlib.blake2b(
+                json.dumps(command, default = str).encode(),
+                digest_size = 16).hexdigest()
+        }
+
+    def _get_job_cache_key(self, job: tuple) -> dict:
+        # everything that decides the pixels and nothing about where they live
+        _, matrix, color_proc, repo_proc = job
+        if repo_proc:
+            resolution = [repo_proc.dest_width, repo_proc.dest_height]
+        else:
+            resolution = None
+        return {
+            "color": color_proc.get_chain_hash() if color_proc else None,
+            "repo": repo_proc.get_oiiotool_cmd(matrix = matrix) if repo_proc else None,
+            "resolution": resolution,
+            "format": Path(self._get_dest_path()).suffix,
+            "compression": self._compression,
+            "channels": "R,G,B"
+        }
+
+    def _get_pending_jobs(self, jobs: list[tuple]) -> list[tuple]:
+        # only keep frames without a current manifest entry and output file,
+        # frames the render cache already holds are linked in instead.
+        frame_set = self.source_sequence.frames.frame_set
+        self._frame_records = {}
+        self._cache_keys = {}
+        pending = []
+        for job in jobs:
+            record = self._get_job_record(job)
+            job_key = self._get_job_cache_key(job) if self._render_cache else None
+            frames = []
+            for frame in (job[0] or frame_set):
+                if self._frames is not None and frame not in self._frames:
+                    continue
+                source_path = self.source_sequence.frames.get_path(frame)
+                dest_path = self._get_dest_frame_path(frame)
+                try:
+                    source = list(cache.stat_signature(source_path))
+                except OSError:
+                    source = None
+                frame_record = dict(record, source = source)
+                self._frame_records[frame] = frame_record
+                if self._incremental and self._manifest.is_current(
+                        frame, frame_record, dest_path):
+                    continue
+                if job_key and source:
+                    # keyed on the full content, sampled blocks miss local edits
+                    key = cache.RenderCache.get_key(dict(
+                        job_key, source = cache.get_file_hash(source_path)))
+                    self._cache_keys[frame] = key
+                    if self._render_cache.fetch(key, dest_path):
+                        self._manifest.update(frame, frame_record, dest_path)
+                        continue
+                # never write into a linked output, it shares the cached file
+                Path(dest_path).unlink(missing_ok = True)
+                frames.append(frame)
+            if frames:
+                pending.append((FrameSet.from_frames(frames),) + tuple(job[1:]))
+        return pending
+
+    def _run_job(self, job: tuple, cmd: list) -> subprocess.CompletedProcess:
+        result = self._run_command(cmd)
+        if result.returncode == 0:
+            # record finished chunks right away so a killed render can resume
+            for frame in job[0]:
+                dest_path = self._get_dest_frame_path(frame)
+                self._manifest.update(frame, self._frame_records[frame], dest_path)
+                if frame in self._cache_keys and Path(dest_path).is_file():
+                    self._render_cache.store(self._cache_keys[frame], dest_path)
+            self._manifest.save()
+        return result
+
+    def _get_autotune_candidates(self) -> list[tuple[int, int]]:
+        # (processes, threads per process) splits of the host cores
+        cpus = os.cpu_count() or 1
+        candidates = []
+        for threads in (1, 2, 4, 8, 16):
+            if threads > cpus:
+                break
+            candidates.append((max(1, cpus // threads), threads))
+        if (1, cpus) not in candidates:
+            candidates.append((1, cpus))
+        return candidates
+
+    def _get_autotune_key(self) -> str:
+        if self.repo_proc:
+            resolution = (self.repo_proc.source_width, self.repo_proc.source_height)
+        else:
+            info = read_image_info(self.source_sequence.frames[0])
+            resolution = (info.display_width, info.display_height)
+        pipeline = {
+            "color": self.color_proc.get_config_hash() if self.color_proc else None,
+            "repo": self.repo_proc.get_oiiotool_cmd() if self.repo_proc else None,
+            "segments": len(self._segments),
+            "roi": self._use_roi
+        }
+        pipeline_hash = hashlib.blake2b(
+            json.dumps(pipeline, sort_keys = True, default = str).encode(),
+            digest_size = 8
+        ).hexdigest()
+        return "{}:{}x{}:{}:{}".format(
+            platform.node(), *resolution, self.format or "source", pipeline_hash)
+
+    def _get_autotune_cache_path(self) -> Path:
+        return Path(cache.get_cache_dir("autotune"), "autotune.json")
+
+    def _read_autotune_cache(self) -> dict:
+        try:
+            with open(self._get_autotune_cache_path().as_posix(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_autotune_cache(self, key: str, entry: dict) -> None:
+        data = self._read_autotune_cache()
+        data[key] = entry
+        path = self._get_autotune_cache_path()
+        tmp_path = path.with_name("{}.{}.tmp".format(path.name, uuid.uuid4().hex))
+        with open(tmp_path.as_posix(), "w") as f:
+            json.dump(data, f, indent = 4)
+        os.replace(tmp_path.as_posix(), path.as_posix())
+
+    def _run_measured(self, cmd: list) -> tuple[int, int]:
+        # return code and peak resident memory of the process in bytes
+        if not hasattr(os, "wait4"):
+            return subprocess.run(cmd).returncode, 0
+        process = subprocess.Popen(cmd)
+        _, status, usage = os.wait4(process.pid, 0)
+        # same convention as Popen, killed processes report minus the signal
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            process.returncode = os.WEXITSTATUS(status)
+        # linux reports kilobytes, macos bytes
+        peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        return process.returncode, peak_rss
+
+    def _run_calibration(self,
+                         jobs: list[tuple],
+                         processes: int,
+                         threads: int) -> dict:
+        frame_count = sum(len(job[0]) for job in jobs)
+        size = max(1, -(-frame_count // processes))
+        chunks = [(chunk,) + tuple(job[1:]) for job in jobs for chunk in job[0].split(size)]
+        render_threads = self._threads
+        self._threads = threads
+        try:
+            commands = [self._get_oiiotool_cmd(*job) for job in chunks]
+        finally:
+            self._threads = render_threads
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers = processes) as pool:
+            results = list(pool.map(self._run_measured, commands))
+        elapsed = time.perf_counter() - start
+        # nothing rendered is no measurement, treat it as a failed candidate
+        failed = not results or any(code != 0 for code, _ in results)
+        return {
+            "processes": processes,
+            "threads": threads,
+            "fps": 0.0 if failed else frame_count / max(elapsed, 1e-6),
+            "peak_rss": max((rss for _, rss in results), default = 0) * min(
+                processes, len(commands))
+        }
+
+    def autotune(self,
+                 calibration_frames: int = None,
+                 candidates: list[tuple[int, int]] = None) -> tuple[int, int]:
+        candidates = candidates or self._get_autotune_candidates()
+        frame_set = self.source_sequence.frames.frame_set
+        calibration_frames = min(len(frame_set), calibration_frames or self._autotune_frames)
+        calibration_set = frame_set.split(calibration_frames)[0]
+        # every process needs a few frames, otherwise only startup gets measured
+        max_processes = max(1, calibration_frames // self._autotune_frames_per_process)
+        candidates = [c for c in candidates if c[0] <= max_processes] or [
+            min(candidates, key = lambda c: c[0])]
+        jobs = []
+        for job in self._get_jobs():
+            frames = FrameSet.from_frames(
+                f for f in (job[0] or frame_set) if f in calibration_set)
+            if frames:
+                jobs.append((frames,) + tuple(job[1:]))
+        render_name = self.name
+        self.name = "{}_autotune".format(render_name)
+        try:
+            self.setup_staging_dir()
+            self._autotune_results = [
+                self._run_calibration(jobs, processes, threads)
+                for processes, threads in candidates
+            ]
+        finally:
+            self._cleanup_configs(jobs)
+            shutil.rmtree(Path(self.staging_dir, self.name).as_posix(), ignore_errors = True)
+            self.name = render_name
+        valid = [
+            r for r in self._autotune_results
+            if r["fps"] > 0 and (not self._autotune_max_rss
+                                 or r["peak_rss"] <= self._autotune_max_rss)
+        ]
+        if not valid:
+            raise RuntimeError("Autotune found no working configuration!")
+        # fastest wins, less memory breaks ties
+        best = max(valid, key = lambda r: (round(r["fps"], 2), -r["peak_rss"]))
+        self._write_autotune_cache(self._get_autotune_key(), best)
+        return best["processes"], best["threads"]
+
+    def get_tuned_settings(self) -> tuple[int, int]:
+        entry = self._read_autotune_cache().get(self._get_autotune_key())
+        if entry:
+            return entry["processes"], entry["threads"]
+        return self.autotune()
+
+    def _run_command(self, cmd: list) -> subprocess.CompletedProcess:
+        for _ in range(self._retries + 1):
+            if self._debug:
+                print("oiiotool cmd >>> {}".format(" ".join(cmd)))
+            result = subprocess.run(cmd)
+            if result.returncode == 0:
+                break
+        return result
+
+    def _render_jobs(self) -> tuple[list[tuple], list[subprocess.CompletedProcess]]:
+        self._manifest = cache.RenderManifest(self._get_manifest_path())
+        all_jobs = self._get_jobs()
+        try:
+            jobs = self._get_pending_jobs(all_jobs)
+            if self._chunks and jobs:
+                jobs = self._split_jobs(jobs)
+            self._commands = [self._get_oiiotool_cmd(*job) for job in jobs]
+            self._command = self._commands[0] if self._commands else []
+            results = []
+            if jobs:
+                workers = self._workers or max(1, (os.cpu_count() or 1) // self._threads)
+                with ThreadPoolExecutor(max_workers = min(workers, len(jobs))) as pool:
+                    results = list(pool.map(self._run_job, jobs, self._commands))
+        finally:
+            self._cleanup_configs(all_jobs)
+            self._manifest.save()
+            if self._render_cache:
+                self._render_cache.evict()
+        return jobs, results
+
+    def render(self) -> SequenceInfo:
+        if not self.color_proc and not self.repo_proc:
+            raise ValueError("Missing both valid Processors!")
+        self.setup_staging_dir()
+        # tuned values only apply to this render, explicit settings survive it
+        render_settings = (self._workers, self._threads, self._chunks)
+        try:
+            if self._autotune:
+                self._workers, self._threads = self.get_tuned_settings()
+                if not self._chunks:
+                    self._chunks = self._workers
+            jobs, results = self._render_jobs()
+        finally:
+            self._workers, self._threads, self._chunks = render_settings
+        failed = [
+            job[0].to_spec()
+            for job, cmd_result in zip(jobs, results)
+            if cmd_result.returncode != 0
+        ]
+        if failed:
+            raise RuntimeError("Failed to render frames {} after {} attempts!".format(
+                ", ".join(failed), self._retries + 1))
+        # every chunk writes into the same sequence, scan it back as one
         result = SequenceInfo()
-        Path(self.color_proc._dest_path).resolve().unlink()
         return result.compute_longest(
-            Path(self.staging_dir, self.name).resolve().as_posix()
+            Path(self.staging_dir, self.name).resolve().as_posix(),
+            index = self._sequence_index
         )
 
     def render_repo_ffmpeg(self,
@@ -137,7 +612,8 @@ class DefaultRenderer:
         subprocess.run(cmd)
         result = SequenceInfo()
         return result.compute_longest(
-            Path(dst).resolve().parent.as_posix()
+            Path(dst).resolve().parent.as_posix(),
+            index = self._sequence_index
         )
 
 
@@ -166,10 +642,7 @@ class DefaultSlateRenderer:
 
     def set_source_sequence(self, source_sequence: SequenceInfo) -> None:
         self.source_sequence = source_sequence
-        head, frame, tail = source_sequence._get_file_splits(source_sequence.frames[0])
-        self.dest = "{}{}{}".format(head,
-                                    str(int(frame) - 1).zfill(source_sequence.padding),
-                                    tail)
+        self.dest = source_sequence.frames.get_path(source_sequence.frame_start - 1)
 
     def set_destination(self, dest: str) -> None:
         self.dest = dest
@@ -0,0 +1,590 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
+import threading
+
+from . import cache
+
+
+_FRAME_PATTERN = re.compile(r"^(.*?)(\d+)$")
+# slotted dataclasses need 3.10, older interpreters get regular ones
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+class FrameSet:
+    __slots__ = ("_starts", "_ends", "_offsets", "_length")
+
+    def __init__(self, ranges: Iterable[tuple[int, int]] = None) -> None:
+        self._starts: list[int] = list([])
+        self._ends: list[int] = list([])
+        self._offsets: list[int] = list([])
+        self._length: int = 0
+        for start, end in sorted(ranges or []):
+            if end < start:
+                raise ValueError(f"Invalid frame range {start}-{end}!")
+            if self._ends and start <= self._ends[-1] + 1:
+                if end > self._ends[-1]:
+                    self._length += end - self._ends[-1]
+                    self._ends[-1] = end
+                continue
+            self._starts.append(start)
+            self._ends.append(end)
+            self._offsets.append(self._length)
+            self._length += end - start + 1
+
+    @classmethod
+    def from_frames(cls, frames: Iterable[int]) -> FrameSet:
+        ranges = []
+        for f in sorted(set(frames)):
+            if ranges and f == ranges[-1][1] + 1:
+                ranges[-1][1] = f
+            else:
+                ranges.append([f, f])
+        return cls(ranges)
+
+    @classmethod
+    def from_spec(cls, spec: str) -> FrameSet:
+        ranges = []
+        for part in spec.replace(" ", "").split(","):
+            if not part:
+                continue
+            bounds = re.match(r"^(-?\d+)(?:-(-?\d+))?$", part)
+            if not bounds:
+                raise ValueError(f"Invalid frame spec '{spec}'!")
+            start = int(bounds.group(1))
+            end = int(bounds.group(2)) if bounds.group(2) else start
+            ranges.append((start, end))
+        return cls(ranges)
+
+    @property
+    def first(self) -> int:
+        return self._starts[0] if self._starts else None
+
+    @property
+    def last(self) -> int:
+        return self._ends[-1] if self._ends else None
+
+    def ranges(self) -> list[tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def gaps(self) -> list[tuple[int, int]]:
+        return [(e + 1, s - 1) for e, s in zip(self._ends, self._starts[1:])]
+
+    def to_spec(self) -> str:
+        return ",".join(
+            str(s) if s == e else "{}-{}".format(s, e)
+            for s, e in zip(self._starts, self._ends)
+        )
+
+    def split(self, size: int) -> list[FrameSet]:
+        # consecutive pieces of at most size frames, in order
+        if size < 1:
+            raise ValueError(f"Invalid chunk size {size}!")
+        chunks = []
+        current = []
+        count = 0
+        for start, end in self.ranges():
+            while start <= end:
+                take = min(end - start + 1, size - count)
+                current.append((start, start + take - 1))
+                count += take
+                start += take
+                if count == size:
+                    chunks.append(FrameSet(current))
+                    current = []
+                    count = 0
+        if current:
+            chunks.append(FrameSet(current))
+        return chunks
+
+    def index(self, frame: int) -> int:
+        i = bisect_right(self._starts, frame) - 1
+        if i < 0 or frame > self._ends[i]:
+            raise ValueError(f"Frame {frame} not in FrameSet!")
+        return self._offsets[i] + frame - self._starts[i]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, frame: int) -> bool:
+        i = bisect_right(self._starts, frame) - 1
+        return i >= 0 and frame <= self._ends[i]
+
+    def __getitem__(self, index: int | slice) -> int | list[int]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("FrameSet index out of range")
+        i = bisect_right(self._offsets, index) - 1
+        return self._starts[i] + index - self._offsets[i]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FrameSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __str__(self) -> str:
+        return self.to_spec()
+
+    def __repr__(self) -> str:
+        return "FrameSet('{}')".format(self.to_spec())
+
+
+class SequenceFrames:
+    __slots__ = ("path", "format_string", "frame_set")
+
+    def __init__(self,
+                 path: str = None,
+                 format_string: str = None,
+                 frame_set: FrameSet = None) -> None:
+        self.path: str = path
+        self.format_string: str = format_string
+        self.frame_set: FrameSet = frame_set if frame_set else FrameSet()
+
+    def get_path(self, frame: int) -> str:
+        return "{}/{}".format(self.path, self.format_string % frame)
+
+    def __len__(self) -> int:
+        return len(self.frame_set)
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self.get_path(f) for f in self.frame_set[index]]
+        return self.get_path(self.frame_set[index])
+
+    def __iter__(self) -> Iterator[str]:
+        for f in self.frame_set:
+            yield self.get_path(f)
+
+    def __contains__(self, path: str) -> bool:
+        if not isinstance(path, str):
+            return False
+        path = path.replace("\\", "/")
+        splits = split_frame_name(os.path.basename(path))
+        if not splits:
+            return False
+        frame = int(splits[1])
+        if frame not in self.frame_set:
+            return False
+        frame_path = self.get_path(frame)
+        return path in (frame_path, os.path.basename(frame_path))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SequenceFrames):
+            return NotImplemented
+        return (self.path, self.format_string, self.frame_set) == (
+            other.path, other.format_string, other.frame_set)
+
+    def __repr__(self) -> str:
+        return "SequenceFrames('{}', '{}', {!r})".format(self.path,
+                                                        self.format_string,
+                                                        self.frame_set)
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class SequenceScan:
+    path: str = None
+    head: str = None
+    tail: str = None
+    padding: int = 0
+    frames: FrameSet = field(default_factory = FrameSet)
+    mixed_padding: bool = False
+
+    @property
+    def frame_start(self) -> int:
+        return self.frames.first
+
+    @property
+    def frame_end(self) -> int:
+        return self.frames.last
+
+    @property
+    def gaps(self) -> list[tuple[int, int]]:
+        return self.frames.gaps()
+
+    @property
+    def hash_string(self) -> str:
+        return "{}#{}".format(self.head, self.tail)
+
+    @property
+    def format_string(self) -> str:
+        return "{}%0{}d{}".format(self.head, self.padding, self.tail)
+
+
+def split_frame_name(name: str) -> tuple[str, str, str] | None:
+    stem, ext = os.path.splitext(name)
+    match = _FRAME_PATTERN.match(stem)
+    if not match:
+        return None
+    return match.group(1), match.group(2), ext
+
+
+def get_padding(token: str) -> int:
+    # unpadded numbers only tell us the padding is at most their length,
+    # zero-led ones pin it exactly.
+    if len(token) > 1 and token[0] == "0":
+        return len(token)
+    return 0
+
+
+def _resolve_paddings(tokens: list[str]) -> dict[int, list[str]]:
+    pinned = sorted(set(get_padding(t) for t in tokens) - {0})
+    if not pinned:
+        return {min(len(t) for t in tokens): tokens}
+    groups = {p: [] for p in pinned}
+    for token in tokens:
+        padding = get_padding(token)
+        if not padding:
+            fitting = [p for p in pinned if p <= len(token)]
+            padding = fitting[-1] if fitting else len(token)
+        groups.setdefault(padding, []).append(token)
+    return groups
+
+
+def _list_entries(scan_dir: str,
+                  collect_dirs: bool = False) -> tuple[list[str], list[str]]:
+    names = []
+    subdirs = []
+    with os.scandir(scan_dir) as it:
+        for entry in it:
+            if collect_dirs:
+                try:
+                    if entry.is_dir(follow_symlinks = False):
+                        subdirs.append(entry.name)
+                        continue
+                except OSError:
+                    continue
+            if not split_frame_name(entry.name):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            names.append(entry.name)
+    return names, subdirs
+
+
+def _group_names(names: Iterable[str]) -> dict[tuple[str, str], list[str]]:
+    grouped: dict[tuple[str, str], list[str]] = {}
+    for name in names:
+        head, token, tail = split_frame_name(name)
+        grouped.setdefault((head, tail), []).append(token)
+    return grouped
+
+
+def _build_scans(path: str,
+                 grouped: dict[tuple[str, str], list[str]]) -> list[SequenceScan]:
+    results = []
+    for (head, tail), tokens in grouped.items():
+        paddings = _resolve_paddings(tokens)
+        mixed = len(paddings) > 1
+        for padding, padded_tokens in paddings.items():
+            results.append(SequenceScan(
+                path = path,
+                head = head,
+                tail = tail,
+                padding = padding,
+                frames = FrameSet.from_frames(int(t) for t in padded_tokens),
+                mixed_padding = mixed
+            ))
+    return results
+
+
+def _sort_scans(scans: list[SequenceScan]) -> list[SequenceScan]:
+    return sorted(scans, key = lambda s: (-len(s.frames), s.head, s.tail, s.padding))
+
+
+def _scan_entries(scan_dir: str,
+                  collect_dirs: bool = False) -> tuple[list[SequenceScan], list[str]]:
+    path = os.path.abspath(scan_dir).replace("\\", "/")
+    names, subdirs = _list_entries(path, collect_dirs)
+    scans = _sort_scans(_build_scans(path, _group_names(names)))
+    return scans, ["{}/{}".format(path, d) for d in subdirs]
+
+
+def scan_directory(scan_dir: str,
+                   index: SequenceIndex = None) -> list[SequenceScan]:
+    if index:
+        return index.scan(scan_dir)[0]
+    return _scan_entries(scan_dir)[0]
+
+
+def _matches_any(rel_path: str, patterns: list[str]) -> bool:
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatch(rel_path, p) or fnmatch(name, p) for p in patterns)
+
+
+def walk_sequences(root: str,
+                   include: list[str] = None,
+                   exclude: list[str] = None,
+                   max_depth: int = None,
+                   workers: int = 8,
+                   index: SequenceIndex = None) -> Iterator[SequenceScan]:
+    root = os.path.abspath(root).replace("\\", "/")
+    include = list(include or [])
+    exclude = list(exclude or [])
+
+    def rel(path: str) -> str:
+        return os.path.relpath(path, root).replace("\\", "/")
+
+    def scan(path: str) -> tuple[list[SequenceScan], list[str]]:
+        if index:
+            return index.scan(path)
+        return _scan_entries(path, True)
+
+    executor = ThreadPoolExecutor(max_workers = max(1, workers))
+    pending = {executor.submit(scan, root): 0}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when = FIRST_COMPLETED)
+            for future in done:
+                depth = pending.pop(future)
+                try:
+                    scans, subdirs = future.result()
+                except OSError:
+                    # unreadable or vanished directories should not stop
+                    # the rest of the walk.
+                    continue
+                if max_depth is None or depth < max_depth:
+                    for d in subdirs:
+                        if exclude and _matches_any(rel(d), exclude):
+                            continue
+                        pending[executor.submit(scan, d)] = depth + 1
+                for seq_scan in scans:
+                    seq_path = rel("{}/{}".format(seq_scan.path, seq_scan.hash_string))
+                    if include and not _matches_any(seq_path, include):
+                        continue
+                    if exclude and _matches_any(seq_path, exclude):
+                        continue
+                    yield seq_scan
+    finally:
+        # stop queued scans when the consumer stops iterating early.
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait = False)
+
+
+class SequenceIndex:
+    def __init__(self,
+                 path: str = None,
+                 racy_window: float = 2.0) -> None:
+        if not path:
+            path = Path(cache.get_cache_dir(), "sequence_index.db").as_posix()
+        self.path: str = path
+        self.racy_window: float = racy_window
+        self.hits: int = 0
+        self.misses: int = 0
+        self.updates: int = 0
+        self._lock = threading.Lock()
+        Path(path).resolve().parent.mkdir(parents = True, exist_ok = True)
+        self._db = sqlite3.connect(path, timeout = 30, check_same_thread = False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS directories (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER,
+                    size INTEGER,
+                    racy INTEGER,
+                    files TEXT,
+                    dirs TEXT,
+                    scans TEXT
+                )""")
+
+    def _encode_scans(self, scans: list[SequenceScan]) -> str:
+        return json.dumps([
+            [s.head, s.tail, s.padding, s.frames.ranges(), s.mixed_padding]
+            for s in scans
+        ])
+
+    def _decode_scans(self, path: str, data: str) -> list[SequenceScan]:
+        return [
+            SequenceScan(
+                path = path,
+                head = head,
+                tail = tail,
+                padding = padding,
+                frames = FrameSet(ranges),
+                mixed_padding = mixed
+            )
+            for head, tail, padding, ranges, mixed in json.loads(data)
+        ]
+
+    def _update(self,
+                path: str,
+                row: tuple,
+                names: list[str]) -> list[SequenceScan]:
+        old_names = json.loads(row[4])
+        added = set(names).difference(old_names)
+        removed = set(old_names).difference(names)
+        changed = set(
+            (head, tail) for head, _, tail in map(split_frame_name, added | removed))
+        # only the head/tail groups touched by the diff get rebuilt, every
+        # other sequence is reused from the stored index as is.
+        scans = [
+            s for s in self._decode_scans(path, row[6])
+            if (s.head, s.tail) not in changed
+        ]
+        grouped = _group_names(n for n in names if split_frame_name(n)[::2] in changed)
+        scans.extend(_build_scans(path, grouped))
+        return scans
+
+    def scan(self, scan_dir: str) -> tuple[list[SequenceScan], list[str]]:
+        path = os.path.abspath(scan_dir).replace("\\", "/")
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM directories WHERE path = ?", (path,)).fetchone()
+        if row and not row[3] and row[1] == stat.st_mtime_ns and row[2] == stat.st_size:
+            self.hits += 1
+            scans = self._decode_scans(path, row[6])
+            return scans, ["{}/{}".format(path, d) for d in json.loads(row[5])]
+
+        names, subdirs = _list_entries(path, True)
+        if row:
+            self.updates += 1
+            scans = _sort_scans(self._update(path, row, names))
+        else:
+            self.misses += 1
+            scans = _sort_scans(_build_scans(path, _group_names(names)))
+        # a directory modified right before we listed it may still change
+        # within the same mtime tick, so it has to be relisted next time.
+        racy = time.time_ns() - stat.st_mtime_ns < self.racy_window * 1e9
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size, int(racy),
+                 json.dumps(names), json.dumps(subdirs), self._encode_scans(scans)))
+        return scans, ["{}/{}".format(path, d) for d in subdirs]
+
+    def invalidate(self, scan_dir: str = None) -> None:
+        with self._lock, self._db:
+            if scan_dir:
+                path = os.path.abspath(scan_dir).replace("\\", "/")
+                self._db.execute("DELETE FROM directories WHERE path = ?", (path,))
+            else:
+                self._db.execute("DELETE FROM directories")
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class FingerprintIndex:
+    # per frame fingerprints of one plate version, compared against the
+    # previous version to find the frames that actually changed.
+    def __init__(self, path: str = None) -> None:
+        self.path: str = path
+        self.entries: dict[int, dict] = {}
+        self._stats: dict[str, int] = {"stat": 0, "sample": 0, "full": 0, "changed": 0}
+        self._lock = threading.Lock()
+        if self.path:
+            self.load()
+
+    @classmethod
+    def for_frames(cls, frames: SequenceFrames) -> FingerprintIndex:
+        key = hashlib.blake2b("{}/{}".format(
+            os.path.abspath(frames.path).replace("\\", "/"), frames.format_string
+        ).encode(), digest_size = 16).hexdigest()
+        return cls(Path(cache.get_cache_dir("fingerprints"), "{}.json".format(key)).as_posix())
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                self.entries = {int(k): v for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            self.entries = {}
+
+    def save(self) -> None:
+        tmp_path = "{}.{}.tmp".format(self.path, uuid.uuid4().hex)
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+    def _get_hash(self, entry: dict, kind: str) -> str:
+        # hashes are computed lazily, only while the file still matches its stat
+        if kind not in entry:
+            try:
+                if list(cache.stat_signature(entry["path"])) != [entry["size"],
+                                                                 entry["mtime_ns"]]:
+                    return None
+            except OSError:
+                return None
+            if kind == "sample":
+                entry[kind] = cache.content_signature(entry["path"])
+            else:
+                entry[kind] = cache.file_hash(entry["path"])
+        return entry[kind]
+
+    def _compare(self, entry: dict, old: dict) -> tuple[str, bool]:
+        if not old or old["size"] != entry["size"]:
+            return "stat", True
+        # the same file, in place or hard linked into the new version, is
+        # trusted by stat alone. Other files may share a coarse mtime tick.
+        same_file = old["path"] == entry["path"] or old.get("inode") == entry["inode"]
+        if same_file and old["mtime_ns"] == entry["mtime_ns"]:
+            entry.update({k: old[k] for k in ("sample", "full") if k in old})
+            return "stat", False
+        old_sample = self._get_hash(old, "sample")
+        if not old_sample or old_sample != self._get_hash(entry, "sample"):
+            return "sample", True
+        old_full = self._get_hash(old, "full")
+        return "full", not old_full or old_full != self._get_hash(entry, "full")
+
+    def _fingerprint(self,
+                     frame: int,
+                     path: str,
+                     previous: FingerprintIndex) -> tuple[int, dict, str, bool]:
+        stat = os.stat(path)
+        entry = {
+            "path": path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "inode": [stat.st_dev, stat.st_ino]
+        }
+        old = previous.entries.get(frame) if previous else None
+        return (frame, entry) + self._compare(entry, old)
+
+    def update(self,
+               frames: SequenceFrames,
+               previous: FingerprintIndex = None,
+               workers: int = 8) -> FrameSet:
+        # stat signatures first, then sampled blocks, full hashes only when
+        # the samples agree. Returns the frames that differ from previous.
+        with ThreadPoolExecutor(max_workers = workers) as pool:
+            results = list(pool.map(
+                lambda f: self._fingerprint(f, frames.get_path(f), previous),
+                frames.frame_set))
+        changed = []
+        with self._lock:
+            self.entries = {}
+            for frame, entry, level, is_changed in results:
+                self.entries[frame] = entry
+                self._stats[level] += 1
+                if is_changed:
+                    changed.append(frame)
+            self._stats["changed"] += len(changed)
+        return FrameSet.from_frames(changed)
+
+    def get_stats(self) -> dict:
+        return dict(self._stats, entries = len(self.entries))
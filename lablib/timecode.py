@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import re
+
+import numpy as np
+
+
+_TIMECODE_PATTERN = re.compile(r"^(\d{1,2}):(\d{2}):(\d{2})([:;])(\d{2})$")
+_TIMECODE_WIDTH = 11
+_DIGITS = np.uint8(ord("0"))
+
+
+def get_nominal_rate(rate: float) -> int:
+    nominal = int(round(rate))
+    if nominal <= 0:
+        raise ValueError(f"Invalid timecode rate {rate}!")
+    return nominal
+
+
+def is_drop_frame_rate(rate: float) -> bool:
+    # 29.97 and 59.94 are the only rates SMPTE drop frame is defined for.
+    nominal = get_nominal_rate(rate)
+    return nominal in (30, 60) and not float(rate).is_integer()
+
+
+def _get_dropped_frames(rate: float) -> int:
+    return get_nominal_rate(rate) // 15 if is_drop_frame_rate(rate) else 0
+
+
+def _get_frames_per_day(rate: float) -> int:
+    return get_nominal_rate(rate) * 86400 - _get_dropped_frames(rate) * (1440 - 144)
+
+
+def _validate_drop_frame(rate: float, drop_frame: bool) -> None:
+    if drop_frame and not is_drop_frame_rate(rate):
+        raise ValueError(f"Rate {rate} is not valid for drop frame timecode!")
+
+
+def _split_frames(frames: np.ndarray,
+                  rate: float,
+                  drop_frame: bool) -> tuple[np.ndarray, ...]:
+    nominal = get_nominal_rate(rate)
+    frames = np.asarray(frames, dtype = np.int64)
+    if frames.size and frames.min() < 0:
+        raise ValueError("Negative frames can not be converted to timecode!")
+    frames = frames % _get_frames_per_day(rate)
+    if drop_frame:
+        dropped = _get_dropped_frames(rate)
+        per_ten_minutes = nominal * 600 - dropped * 9
+        per_minute = nominal * 60 - dropped
+        tens, rest = np.divmod(frames, per_ten_minutes)
+        frames = frames + dropped * 9 * tens + np.where(
+            rest > dropped,
+            dropped * ((rest - dropped) // per_minute),
+            0
+        )
+    seconds, ff = np.divmod(frames, nominal)
+    minutes, ss = np.divmod(seconds, 60)
+    hh, mm = np.divmod(minutes, 60)
+    return hh, mm, ss, ff
+
+
+def frames_to_timecodes(frames: np.ndarray,
+                        rate: float,
+                        drop_frame: bool = False) -> np.ndarray:
+    _validate_drop_frame(rate, drop_frame)
+    frames = np.asarray(frames, dtype = np.int64)
+    fields = _split_frames(frames.ravel(), rate, drop_frame)
+    # write the ascii digits straight into a fixed width byte buffer, which
+    # is far cheaper than formatting every string in python.
+    buffer = np.empty((frames.size, _TIMECODE_WIDTH), dtype = np.uint8)
+    for i, value in enumerate(fields):
+        tens, units = np.divmod(value, 10)
+        buffer[:, i * 3] = tens + _DIGITS
+        buffer[:, i * 3 + 1] = units + _DIGITS
+    buffer[:, 2] = buffer[:, 5] = ord(":")
+    buffer[:, 8] = ord(";") if drop_frame else ord(":")
+    result = buffer.view("S{}".format(_TIMECODE_WIDTH)).ravel().astype(
+        "U{}".format(_TIMECODE_WIDTH))
+    return result.reshape(frames.shape)
+
+
+def timecodes_to_frames(timecodes: np.ndarray, rate: float) -> np.ndarray:
+    nominal = get_nominal_rate(rate)
+    timecodes = np.asarray(timecodes)
+    buffer = np.ascontiguousarray(
+        timecodes.ravel().astype("S{}".format(_TIMECODE_WIDTH))
+    ).view(np.uint8).reshape(-1, _TIMECODE_WIDTH)
+    digits = buffer[:, [0, 1, 3, 4, 6, 7, 9, 10]].astype(np.int64) - int(_DIGITS)
+    if buffer.size and ((digits < 0).any() or (digits > 9).any()
+                        or (buffer[:, [2, 5]] != ord(":")).any()
+                        or not np.isin(buffer[:, 8], (ord(":"), ord(";"))).all()):
+        raise ValueError("Timecodes must be formatted as HH:MM:SS:FF!")
+    hh = digits[:, 0] * 10 + digits[:, 1]
+    mm = digits[:, 2] * 10 + digits[:, 3]
+    ss = digits[:, 4] * 10 + digits[:, 5]
+    ff = digits[:, 6] * 10 + digits[:, 7]
+    if (ff >= nominal).any():
+        raise ValueError(f"Timecode frames exceed rate {rate}!")
+    drop = buffer[:, 8] == ord(";")
+    if drop.any():
+        _validate_drop_frame(rate, True)
+    total_minutes = hh * 60 + mm
+    frames = ((hh * 3600 + mm * 60 + ss) * nominal + ff
+              - np.where(drop,
+                         _get_dropped_frames(rate) * (total_minutes - total_minutes // 10),
+                         0))
+    return frames.reshape(timecodes.shape)
+
+
+def timecode_range(start: str,
+                   count: int,
+                   rate: float,
+                   drop_frame: bool = None) -> np.ndarray:
+    if drop_frame is None:
+        drop_frame = ";" in start
+    first = from_timecode(start, rate)
+    return frames_to_timecodes(np.arange(first, first + count), rate, drop_frame)
+
+
+def offset_timecodes(timecodes: np.ndarray,
+                     offsets: np.ndarray | int,
+                     rate: float,
+                     drop_frame: bool = None) -> np.ndarray:
+    timecodes = np.asarray(timecodes)
+    if drop_frame is None:
+        drop_frame = bool(np.char.count(timecodes.astype(str), ";").any())
+    frames = timecodes_to_frames(timecodes, rate) + np.asarray(offsets, dtype = np.int64)
+    return frames_to_timecodes(frames % _get_frames_per_day(rate), rate, drop_frame)
+
+
+def from_timecode(timecode: str, rate: float) -> int:
+    match = _TIMECODE_PATTERN.match(timecode.strip().replace("\"", "").replace("'", ""))
+    if not match:
+        raise ValueError(f"Invalid timecode '{timecode}'!")
+    hh, mm, ss, sep, ff = match.groups()
+    return int(timecodes_to_frames("{:02d}:{}:{}{}{}".format(int(hh), mm, ss, sep, ff), rate))
+
+
+def to_timecode(frames: int,
+                rate: float,
+                drop_frame: bool = None) -> str:
+    if drop_frame is None:
+        drop_frame = is_drop_frame_rate(rate)
+    return str(frames_to_timecodes(int(frames), rate, drop_frame))
+
+
+def offset_timecode(timecode: str,
+                    frame_offset: int,
+                    rate: float,
+                    drop_frame: bool = None) -> str:
+    if drop_frame is None:
+        drop_frame = ";" in timecode
+    frames = (from_timecode(timecode, rate) + frame_offset) % _get_frames_per_day(rate)
+    return to_timecode(frames, rate, drop_frame)
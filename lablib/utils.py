@@ -1,16 +1,22 @@
 from __future__ import annotations
 
+from bisect import bisect_right
+from dataclasses import fields
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from pathlib import Path
+from typing import Iterator
 
 import subprocess
 import os
 import math
 import uuid
 
-import opentimelineio as otio
+from . import cache, headers, matrices, timecode
+from .operators import ImageInfo, SequenceInfo
 
-from .operators import ImageInfo
+
+_metadata_cache = cache.MetadataCache()
 
 
 class format_dict(dict):
@@ -19,19 +25,7 @@ class format_dict(dict):
         return self._placeholder
 
 
-def read_image_info(path: str,
-                    default_timecode: str = None,
-                    default_fps: float = None,
-                    default_par: float = None,
-                    default_channels: int = None) -> ImageInfo:
-    
-    if not default_timecode: default_timecode = "01:00:00:01"
-    if not default_fps: default_fps = 24.0
-    if not default_par: default_par = 1.0
-    if not default_channels: default_channels = 3
-
-    abspath = Path(path).as_posix()
-
+def _probe_image_info(abspath: str) -> dict:
     result = {
         "filename": abspath,
         "origin_x": None,
@@ -64,17 +58,21 @@ def read_image_info(path: str,
         abspath
     ]
 
-    iinfo_out = subprocess.run(
+    # both probes are started before waiting on either, so they run side by side
+    iinfo_proc = subprocess.Popen(
         iinfo_cmd,
-        capture_output=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
         text=True
-    ).stdout.strip().splitlines()
-    
-    ffprobe_out = subprocess.run(
+    )
+    ffprobe_proc = subprocess.Popen(
         ffprobe_cmd,
-        capture_output=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
         text=True
-    ).stdout.strip().splitlines()
+    )
+    iinfo_out = iinfo_proc.communicate()[0].strip().splitlines()
+    ffprobe_out = ffprobe_proc.communicate()[0].strip().splitlines()
     
     for l in iinfo_out:
         if abspath in l and l.find(abspath) < 2:
@@ -139,6 +137,44 @@ def read_image_info(path: str,
         else:
             result[k] = v
     
+    return result
+
+
+def get_metadata_cache() -> cache.MetadataCache:
+    return _metadata_cache
+
+
+def set_metadata_cache(metadata_cache: cache.MetadataCache) -> None:
+    global _metadata_cache
+    _metadata_cache = metadata_cache
+
+
+def read_image_info(path: str,
+                    default_timecode: str = None,
+                    default_fps: float = None,
+                    default_par: float = None,
+                    default_channels: int = None,
+                    use_cache: bool = True) -> ImageInfo:
+    
+    if not default_timecode: default_timecode = "01:00:00:01"
+    if not default_fps: default_fps = 24.0
+    if not default_par: default_par = 1.0
+    if not default_channels: default_channels = 3
+
+    abspath = Path(path).as_posix()
+
+    info = _metadata_cache.get(abspath) if use_cache else None
+    if info is None:
+        info = headers.read_header(abspath)
+        if info is None:
+            info = _probe_image_info(abspath)
+        # a failed probe may be transient (missing tools), don't pin it
+        if use_cache and any(v is not None for k, v in info.items() if k != "filename"):
+            _metadata_cache.put(abspath, info)
+    result = dict.fromkeys(f.name for f in fields(ImageInfo))
+    result.update(info)
+    result["filename"] = abspath
+
     if not result["width"]: result["width"] = result["display_width"]
     if not result["height"]: result["height"] = result["display_height"]
     if not result["origin_x"]: result["origin_x"] = 0
@@ -153,6 +189,114 @@ def read_image_info(path: str,
     return image_info
 
 
+_SEQUENCE_INFO_KEYS = (
+    "origin_x",
+    "origin_y",
+    "width",
+    "height",
+    "display_width",
+    "display_height",
+    "channels",
+    "fps",
+    "par"
+)
+
+
+class ImageInfoSequence:
+    def __init__(self,
+                 files: list[str],
+                 probed: dict[int, ImageInfo]) -> None:
+        self.files = files
+        self.probed = probed
+        self._probed_indices = sorted(probed)
+
+    def _get_signature(self, info: ImageInfo) -> tuple:
+        return tuple(getattr(info, k) for k in _SEQUENCE_INFO_KEYS)
+
+    @property
+    def changes(self) -> list[int]:
+        result = []
+        for prev, curr in zip(self._probed_indices, self._probed_indices[1:]):
+            if self._get_signature(self.probed[prev]) != self._get_signature(self.probed[curr]):
+                result.append(curr)
+        return result
+
+    def is_uniform(self) -> bool:
+        return not self.changes
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __getitem__(self, index: int) -> ImageInfo:
+        if index < 0:
+            index += len(self.files)
+        if not 0 <= index < len(self.files):
+            raise IndexError("ImageInfoSequence index out of range")
+        if index in self.probed:
+            return self.probed[index]
+        # unprobed frames are views on the closest probed frame before them
+        nearest = self._probed_indices[bisect_right(self._probed_indices, index) - 1]
+        source = self.probed[nearest]
+        info = ImageInfo(**{f.name: getattr(source, f.name) for f in fields(ImageInfo)})
+        info.filename = Path(self.files[index]).as_posix()
+        info.timecode = offset_timecode(tc = source.timecode,
+                                        frame_offset = index - nearest,
+                                        fps = source.fps)
+        return info
+
+    def __iter__(self) -> Iterator[ImageInfo]:
+        for i in range(len(self.files)):
+            yield self[i]
+
+
+def read_sequence_info(source: SequenceInfo | list[str],
+                       sample_step: int = 100,
+                       probe_all: bool = False,
+                       refine: bool = True,
+                       workers: int = 8,
+                       default_timecode: str = None,
+                       default_fps: float = None,
+                       default_par: float = None,
+                       default_channels: int = None) -> ImageInfoSequence:
+    files = source.frames if isinstance(source, SequenceInfo) else list(source)
+    if not len(files):
+        raise ValueError("Missing files to probe!")
+    probed = {}
+
+    def probe(indices: list[int]) -> None:
+        infos = executor.map(
+            lambda i: read_image_info(files[i],
+                                      default_timecode = default_timecode,
+                                      default_fps = default_fps,
+                                      default_par = default_par,
+                                      default_channels = default_channels),
+            indices)
+        probed.update(zip(indices, infos))
+
+    with ThreadPoolExecutor(max_workers = max(1, workers)) as executor:
+        count = len(files)
+        if probe_all:
+            probe(list(range(count)))
+            return ImageInfoSequence(files, probed)
+        step = max(1, sample_step or count)
+        probe(sorted(set([0, count - 1]).union(range(0, count, step))))
+        # bisect every sampled span whose ends disagree until the exact
+        # frame where the change happens is known.
+        while refine:
+            sequence = ImageInfoSequence(files, probed)
+            indices = sequence._probed_indices
+            changes = set(sequence.changes)
+            midpoints = []
+            for prev, curr in zip(indices, indices[1:]):
+                if curr - prev > 1 and curr in changes:
+                    midpoints.append((prev + curr) // 2)
+            if not midpoints:
+                break
+            probe(midpoints)
+
+    return ImageInfoSequence(files, probed)
+
+
 def offset_timecode(tc: str,
                     frame_offset: int = None,
                     fps: float = None) -> str:
@@ -160,13 +304,10 @@ def offset_timecode(tc: str,
         frame_offset = -1
     if not fps:
         fps = 24.0
-    is_drop = not fps.is_integer()
-    rationaltime = otio.opentime.from_timecode(tc, fps)
-    frames = rationaltime.to_frames(fps)
-    frames += frame_offset
-    computed_rationaltime = otio.opentime.from_frames(frames, fps)
-    computed_tc = otio.opentime.to_timecode(
-        computed_rationaltime,
+    is_drop = timecode.is_drop_frame_rate(fps)
+    computed_tc = timecode.offset_timecode(
+        tc,
+        frame_offset,
         fps,
         is_drop
     )
@@ -223,16 +364,12 @@ def mirror_matrix(x: bool = False) -> list[list[float]]:
 
 def mult_matrix(m1: list[list[float]],
                 m2: list[list[float]]) -> list[list[float]]:
-    return [[sum(a * b for a, b in zip(m1_row, m2_col)) for m2_col in zip(*m2)] for m1_row in m1]
+    return matrices.compose(m1, m2).tolist()
 
 
 def mult_matrix_vector(m: list[list[float]],
                        v: list[float]) -> list[float]:
-    result = [0.0, 0.0, 0.0]
-    for i in range(len(m)):
-        for j in range(len(v)):
-            result[i] += m[i][j] * v[j]
-    return result
+    return matrices.transform_vectors(m, v).tolist()
 
 
 def flip_matrix(w: float) -> list[list[float]]:
@@ -258,20 +395,11 @@ def flop_matrix(h: float) -> list[list[float]]:
 
 
 def transpose_matrix(m: list[list[float]]) -> list[list[float]]:
-    res = identity_matrix()
-    for i in range(len(m)):
-        for j in range(len(m[0])):
-            res[i][j] = m[j][i]
-    return res
+    return matrices.transpose(m).tolist()
 
 
 def matrix_to_44(m: list[list[float]]) -> list[list[float]]:
-    result = m
-    result[0].insert(2, 0.0)
-    result[1].insert(2, 0.0)
-    result[2].insert(2, 0.0)
-    result.insert(2, [0.0, 0.0, 1.0, 0.0])
-    return result
+    return matrices.to_44(m).tolist()
 
 
 def matrix_to_list(m: list[list[float]]) -> list[float]:
@@ -294,31 +422,11 @@ def matrix_to_cornerpin(m: list[list[float]],
                         w: int,
                         h: int,
                         origin_upperleft: bool = True) -> list:
-    cornerpin = []
-    if origin_upperleft:
-        corners = [[0, h, 1], [w, h, 1], [0, 0, 1], [w, 0, 1]]
-    else:
-        corners = [[0, 0, 1], [w, 0, 1], [0, h, 1], [w, h, 1]]
-    transformed_corners = [mult_matrix_vector(m, corner) for corner in corners]
-    transformed_corners = [[corner[0] / corner[2], corner[1] / corner[2]] for corner in transformed_corners]
-    for i, corner in enumerate(transformed_corners):
-        x, y = corner
-        cornerpin.extend([x,y])
-    return cornerpin
+    return matrices.to_cornerpin(m, w, h, origin_upperleft).tolist()
 
 
 def calculate_matrix(t: list[float],
                      r: float,
                      s: list[float],
                      c: list[float]) -> list[list[float]]:
-    c_inv = [-c[0], -c[1]]
-    center = translate_matrix(c)
-    center_inv = translate_matrix(c_inv)
-    translate = translate_matrix(t)
-    rotate = rotate_matrix(r)
-    scale = scale_matrix(s)
-    result = mult_matrix(translate, center)
-    result = mult_matrix(result, scale)
-    result = mult_matrix(result, rotate)
-    result = mult_matrix(result, center_inv)
-    return result
+    return matrices.calculate(t, r, s, c).tolist()
@@ -21,6 +21,8 @@ SLATE_TEMPLATE_PATH = "templates/slates/slate_generic/slate_generic.html"
 STAGING_DIR = "results"
 OUTPUT_WIDTH = 1920
 OUTPUT_HEIGHT = 1080
+# render effects only within their timeline windows, one command per segment
+USE_EFFECT_SEGMENTS = False
 
 # Env Setup
 script_location = os.path.dirname(os.path.realpath(__file__))
@@ -59,6 +61,11 @@ rpr = processors.RepoProcessor(
     dest_width = OUTPUT_WIDTH,
     dest_height = OUTPUT_HEIGHT
 )
+# effect curves are keyed on timeline frames, segments carry their own offset
+rpr.set_frame_offset(epr.get_frame_offset(
+    main_seq.frame_start,
+    handle_start = working_data.get("handleStart", 0)
+))
 
 # Render the sequence
 rend = renderers.DefaultRenderer(
@@ -68,8 +75,16 @@ rend = renderers.DefaultRenderer(
     staging_dir = STAGING_DIR,
     format = ".png"
 )
+if USE_EFFECT_SEGMENTS:
+    rend.set_segments(epr.get_segments(
+        main_seq.frame_start,
+        main_seq.frame_end,
+        handle_start = working_data.get("handleStart", 0)
+    ))
 # rend.set_debug(True)
 rend.set_threads(8)
+# rend.set_chunks(4, retries = 1)
+# rend.set_autotune(True)
 computed_seq = rend.render()
 
 # Compute slate
@@ -0,0 +1,43 @@
+import os
+
+from lablib import cache
+
+
+def test_render_cache_fetch_and_store(tmp_path):
+    render_cache = cache.RenderCache((tmp_path / "renders").as_posix())
+    key = render_cache.get_key({"source": "abc", "pipeline": [1, 2]})
+    assert key == render_cache.get_key({"pipeline": [1, 2], "source": "abc"})
+    dest = tmp_path / "out" / "frame.1001.exr"
+    dest.parent.mkdir()
+    assert not render_cache.fetch(key, dest.as_posix())
+
+    src = tmp_path / "render.exr"
+    src.write_bytes(b"pixels")
+    render_cache.store(key, src.as_posix())
+    render_cache.store(key, src.as_posix())
+    assert render_cache.fetch(key, dest.as_posix())
+    assert dest.read_bytes() == b"pixels"
+    stats = render_cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+    assert (stats["entries"], stats["bytes"]) == (1, 6)
+
+
+def test_render_cache_evicts_least_recently_used(tmp_path):
+    render_cache = cache.RenderCache((tmp_path / "renders").as_posix(), max_bytes = 250)
+    keys = [render_cache.get_key({"frame": frame}) for frame in range(3)]
+    for age, key in enumerate(keys):
+        # stored objects are hard links, every render needs its own file
+        src = tmp_path / "render.{}.exr".format(age)
+        src.write_bytes(b"x" * 100)
+        render_cache.store(key, src.as_posix())
+        obj_path = render_cache._get_object_path(key, ".exr").as_posix()
+        os.utime(obj_path, ns = (age * 10 ** 9, age * 10 ** 9))
+    # a fetch marks the oldest object as used
+    assert render_cache.fetch(keys[0], (tmp_path / "dest.exr").as_posix())
+    assert render_cache.evict() == 1
+    assert render_cache.fetch(keys[0], (tmp_path / "dest.exr").as_posix())
+    assert not render_cache.fetch(keys[1], (tmp_path / "dest.exr").as_posix())
+    assert render_cache.fetch(keys[2], (tmp_path / "dest.exr").as_posix())
+    assert render_cache.get_stats()["evictions"] == 1
+    render_cache.clear()
+    assert render_cache.get_stats()["entries"] == 0
@@ -0,0 +1,54 @@
+import shutil
+
+from lablib import operators, processors
+
+
+EFFECT_PATH = "resources/public/effectPlateMain/v000/BLD_010_0010_effectPlateMain_v000.json"
+
+
+def test_segments_cover_handles():
+    epr = processors.EffectsFileProcessor(EFFECT_PATH)
+    segments = epr.get_segments(1001, 1100)
+    assert [(s.frame_start, s.frame_end) for s in segments] == [(1001, 1100)]
+    assert len(segments[0].color_operators) == len(epr.color_operators)
+    assert len(segments[0].repo_operators) == len(epr.repo_operators)
+
+
+def test_handle_start_aligns_cut_in():
+    epr = processors.EffectsFileProcessor(EFFECT_PATH)
+    assert epr.get_frame_offset(1001, handle_start = 8) == 154 - 1009
+    segments = epr.get_segments(1001, 1100, handle_start = 8, extend_handles = False)
+    assert [(s.frame_start, s.frame_end) for s in segments] == [
+        (1001, 1008), (1009, 1059), (1060, 1100)]
+    assert not segments[0].color_operators and segments[1].color_operators
+
+
+def test_operator_class_dispatch():
+    assert processors.get_operator_class("OCIOCDLTransform") == (operators.CDLTransform, False)
+    assert processors.get_operator_class("OCIOColorSpace") == (
+        operators.ColorSpaceTransform, False)
+    assert processors.get_operator_class("Transform") == (operators.RepoTransform, True)
+    assert processors.get_operator_class("Blur") == (None, False)
+
+
+def test_load_many_matches_single_loads(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / "effect_{}.json".format(i)
+        shutil.copy(EFFECT_PATH, path.as_posix())
+        paths.append(path.as_posix())
+    loaded = processors.EffectsFileProcessor.load_many(paths, workers = 2)
+    assert [epr.src for epr in loaded] == paths
+    single = processors.EffectsFileProcessor(EFFECT_PATH)
+    for epr in loaded:
+        assert epr.color_operators == single.color_operators
+        assert epr.repo_operators == single.repo_operators
+
+
+def test_cached_effects_are_copies(tmp_path):
+    path = tmp_path / "effect.json"
+    shutil.copy(EFFECT_PATH, path.as_posix())
+    first = processors.EffectsFileProcessor(path.as_posix())
+    first.repo_operators[0].disable = True
+    second = processors.EffectsFileProcessor(path.as_posix())
+    assert not second.repo_operators[0].disable
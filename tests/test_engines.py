@@ -0,0 +1,108 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from lablib import engines, matrices, operators, processors
+
+
+def _write_pfm(path, image):
+    # pfm rows are stored bottom to top
+    with open(path, "wb") as f:
+        f.write("PF\n{} {}\n-1.0\n".format(image.shape[1], image.shape[0]).encode())
+        f.write(np.ascontiguousarray(image[::-1, :, :3], dtype = "<f4").tobytes())
+
+
+def _read_pfm(path):
+    with open(path, "rb") as f:
+        f.readline()
+        width, height = (int(v) for v in f.readline().split())
+        byte_order = "<" if float(f.readline()) < 0 else ">"
+        data = np.frombuffer(f.read(), dtype = byte_order + "f4")
+    return data.reshape(height, width, 3)[::-1].astype(np.float32)
+
+
+def _get_repo_processor(fused):
+    rpr = processors.RepoProcessor(
+        operators = [operators.RepoTransform(
+            translate = [3.0, -2.0],
+            rotate = 4.0,
+            scale = [1.1, 1.1],
+            center = [48.0, 32.0]
+        )],
+        source_width = 96,
+        source_height = 64,
+        dest_width = 72,
+        dest_height = 40
+    )
+    rpr.set_fused(fused)
+    return rpr
+
+
+def _get_image():
+    y, x = np.mgrid[0:64, 0:96] + 0.5
+    return np.stack([
+        x / 96.0,
+        y / 64.0,
+        0.5 + 0.5 * np.sin(x / 5.0) * np.cos(y / 7.0)
+    ], axis = -1).astype(np.float32)
+
+
+def test_filter_radii_shared_with_roi():
+    for name, radius in processors.FILTER_RADII.items():
+        assert engines.FILTERS[name][0] == radius
+
+
+def test_cubic_matches_oiio_kernel():
+    # OIIO's a = 0 cubic stretched over its default width of 4
+    radius, kernel = engines.FILTERS["cubic"]
+    x = np.array([0.0, 0.5, 1.0, 1.5, 2.0])
+    t = x / 2.0
+    np.testing.assert_allclose(kernel(x), 1.0 - 3.0 * t ** 2 + 2.0 * t ** 3, atol = 1e-6)
+    assert radius == 2.0
+
+
+@pytest.mark.skipif(not shutil.which("oiiotool"), reason = "oiiotool not found")
+@pytest.mark.parametrize("fused", [True, False])
+def test_warp_parity_with_oiiotool(tmp_path, fused):
+    rpr = _get_repo_processor(fused)
+    image = _get_image()
+    src_path = (tmp_path / "source.pfm").as_posix()
+    dst_path = (tmp_path / "result.pfm").as_posix()
+    _write_pfm(src_path, image)
+    subprocess.run(["oiiotool", src_path] + rpr.get_oiiotool_cmd() + ["-o", dst_path],
+                   check = True)
+    expected = _read_pfm(dst_path)
+    engine = engines.RepoEngine(rpr, threads = 1)
+    result = engine.apply(image, fused = fused)
+    # the whole frame, edges included
+    assert result.shape == expected.shape
+    np.testing.assert_allclose(result, expected, atol = 2e-3)
+
+
+def test_fused_command_is_a_single_resample():
+    staged = _get_repo_processor(False).get_oiiotool_cmd()
+    fused = _get_repo_processor(True).get_oiiotool_cmd()
+    assert [a for a in staged if a.startswith("--")] == [
+        "--warp:filter=cubic:recompute_roi=1", "--crop", "--fullsize", "--resize"]
+    assert [a for a in fused if a.startswith("--")] == [
+        "--warp:filter=cubic:recompute_roi=1", "--crop", "--fullsize"]
+    assert fused[fused.index("--crop") + 1] == "72x40+0+0"
+
+
+def test_fused_matches_staged_inside_plate():
+    # a ramp survives both resampling paths, away from the plate edges
+    y, x = np.mgrid[0:64, 0:96] + 0.5
+    image = np.stack([x / 96.0, y / 64.0, (x + y) / 160.0], axis = -1).astype(np.float32)
+    fused_proc = _get_repo_processor(True)
+    fused = engines.RepoEngine(fused_proc, threads = 1).apply(image)
+    staged = engines.RepoEngine(_get_repo_processor(False), threads = 1).apply(image)
+    inverse = np.linalg.inv(np.asarray(fused_proc.get_output_matrix()))
+    dest_y, dest_x = np.mgrid[0:40, 0:72] + 0.5
+    source = matrices.transform_points(
+        inverse, np.stack([dest_x.ravel(), dest_y.ravel()], axis = -1)).reshape(40, 72, 2)
+    inside = ((source[..., 0] > 6.0) & (source[..., 0] < 90.0)
+              & (source[..., 1] > 6.0) & (source[..., 1] < 58.0))
+    assert inside.sum() > 1000
+    np.testing.assert_allclose(fused[inside], staged[inside], atol = 2e-3)
@@ -0,0 +1,32 @@
+import io
+import struct
+
+from lablib.headers import read_exr_header
+from lablib.utils import offset_timecode
+
+
+def _exr_attr(name: str, attr_type: str, value: bytes) -> bytes:
+    return (name.encode() + b"\x00" + attr_type.encode() + b"\x00"
+            + struct.pack("<i", len(value)) + value)
+
+
+def _exr_header(fps: tuple[int, int], time_and_flags: int) -> io.BytesIO:
+    data = b"\x76\x2f\x31\x01" + struct.pack("<I", 2)
+    data += _exr_attr("framesPerSecond", "rational", struct.pack("<iI", *fps))
+    data += _exr_attr("timeCode", "timecode", struct.pack("<2I", time_and_flags, 0))
+    return io.BytesIO(data + b"\x00")
+
+
+# 01:00:00:05 with the drop frame bit set
+_DROP_FRAME_TC = (0x01 << 24) | 0x05 | 0x40
+
+
+def test_exr_drop_frame_bit_ignored_at_24fps():
+    result = read_exr_header(_exr_header((24, 1), _DROP_FRAME_TC))
+    assert result["timecode"] == "01:00:00:05"
+    assert offset_timecode(result["timecode"], -1, result["fps"]) == "01:00:00:04"
+
+
+def test_exr_drop_frame_bit_kept_at_2997():
+    result = read_exr_header(_exr_header((30000, 1001), _DROP_FRAME_TC))
+    assert result["timecode"] == "01:00:00;05"
@@ -0,0 +1,42 @@
+import numpy as np
+
+from lablib import luts
+
+
+def _write_cube(path, header, table):
+    lines = list(header)
+    lines.extend("{} {} {}".format(*row) for row in table)
+    path.write_text("\n".join(lines) + "\n")
+    return path.as_posix()
+
+
+def _identity_3d(size, low, high):
+    axis = np.linspace(low, high, size)
+    # red changes fastest in the file
+    return [(r, g, b) for b in axis for g in axis for r in axis]
+
+
+def test_3d_input_range_sets_domain(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABLIB_CACHE_DIR", str(tmp_path / "cache"))
+    path = _write_cube(tmp_path / "range.cube",
+                       ["LUT_3D_SIZE 5", "LUT_3D_INPUT_RANGE -1.0 3.0"],
+                       _identity_3d(5, -1.0, 3.0))
+    for use_cache in (False, True, True):
+        lut = luts.read_cube(path, use_cache = use_cache)
+        assert lut.domain_min.tolist() == [-1.0] * 3
+        assert lut.domain_max.tolist() == [3.0] * 3
+        image = np.array([[[-0.5, 0.75, 2.5]]], dtype = np.float32)
+        np.testing.assert_allclose(lut.apply(image), image, atol = 1e-6)
+
+
+def test_3d_input_range_on_shaped_cube(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABLIB_CACHE_DIR", str(tmp_path / "cache"))
+    # the shaper maps 0..4 onto 0..2, the lattice covers 0..2
+    shaper = [(v / 2.0,) * 3 for v in np.linspace(0.0, 4.0, 9)]
+    path = _write_cube(tmp_path / "shaped.cube",
+                       ["LUT_1D_SIZE 9", "LUT_1D_INPUT_RANGE 0.0 4.0",
+                        "LUT_3D_SIZE 3", "LUT_3D_INPUT_RANGE 0.0 2.0"],
+                       shaper + _identity_3d(3, 0.0, 2.0))
+    lut = luts.read_cube(path, use_cache = False)
+    image = np.array([[[1.0, 2.0, 3.0]]], dtype = np.float32)
+    np.testing.assert_allclose(lut.apply(image), image / 2.0, atol = 1e-6)
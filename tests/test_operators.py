@@ -0,0 +1,88 @@
+import sys
+
+import pytest
+
+from lablib import sequences
+from lablib.operators import Curve, RepoTransform, SequenceInfo
+from lablib.processors import RepoProcessor
+
+
+def _touch(directory, names):
+    directory.mkdir(parents = True, exist_ok = True)
+    for name in names:
+        (directory / name).write_bytes(b"x")
+
+
+def test_compute_all_sorts_frames_numerically(tmp_path):
+    # unpadded frames sort as numbers, not as strings
+    _touch(tmp_path, ["render.{}.png".format(f) for f in (9, 10, 100, 8)])
+    _touch(tmp_path, ["matte.{:04d}.exr".format(f) for f in (1, 2)])
+    result = SequenceInfo().compute_all(tmp_path.as_posix())
+    assert [s.head for s in result] == ["render.", "matte."]
+    render = result[0]
+    assert list(render.frames.frame_set) == [8, 9, 10, 100]
+    assert (render.frame_start, render.frame_end) == (8, 100)
+    assert render.gaps == [(11, 99)]
+    assert render.hash_string == "render.#.png"
+    assert render.frames[0] == "{}/render.8.png".format(tmp_path.as_posix())
+
+
+def test_compute_longest(tmp_path):
+    _touch(tmp_path, ["a.{:04d}.exr".format(f) for f in range(1001, 1004)])
+    _touch(tmp_path, ["b.{:04d}.exr".format(f) for f in range(1001, 1011)])
+    longest = SequenceInfo().compute_longest(tmp_path.as_posix())
+    assert longest.head == "b." and longest._get_length() == 10
+
+
+def test_from_scan_is_slotted(tmp_path):
+    _touch(tmp_path, ["plate.{:04d}.exr".format(f) for f in (1001, 1002, 1005)])
+    info = SequenceInfo().compute_longest(tmp_path.as_posix())
+    assert info.frames.frame_set.to_spec() == "1001-1002,1005"
+    assert info.format_string == "plate.%04d.exr" and info.padding == 4
+    assert info.gaps == [(1003, 1004)]
+    if sys.version_info >= (3, 10):
+        with pytest.raises(AttributeError):
+            info.unknown = 1
+
+
+def test_compute_all_with_persistent_index(tmp_path):
+    plate_dir = tmp_path / "plate"
+    _touch(plate_dir, ["plate.{:04d}.exr".format(f) for f in range(1001, 1004)])
+    db_path = (tmp_path / "index.db").as_posix()
+    index = sequences.SequenceIndex(db_path, racy_window = 0)
+    try:
+        expected = SequenceInfo().compute_all(plate_dir.as_posix())
+        assert SequenceInfo().compute_all(plate_dir.as_posix(), index = index) == expected
+    finally:
+        index.close()
+    # a second index on the same database answers without listing
+    index = sequences.SequenceIndex(db_path, racy_window = 0)
+    try:
+        assert SequenceInfo().compute_all(plate_dir.as_posix(), index = index) == expected
+        assert (index.hits, index.misses) == (1, 0)
+    finally:
+        index.close()
+
+
+def test_scalar_scale_curve_is_uniform():
+    xform = RepoTransform(scale = Curve([(1, 1.0), (11, 2.0)]))
+    _, _, scale, _ = xform.get_values([6])
+    assert scale.tolist() == [[1.5, 1.5]]
+
+
+def test_scalar_translate_curve_is_rejected():
+    xform = RepoTransform(translate = Curve([(1, 0.0), (11, 10.0)]))
+    with pytest.raises(ValueError):
+        xform.get_values([6])
+
+
+def test_repo_frame_offset_maps_to_timeline_frames():
+    xform = RepoTransform(translate = Curve([(100, [0.0, 0.0]), (110, [10.0, 0.0])]))
+    rpr = RepoProcessor(operators = [xform],
+                        source_width = 64, source_height = 32,
+                        dest_width = 64, dest_height = 32)
+    rpr.set_frame_offset(100 - 1001)
+    offset = rpr.get_matrix_chained(frame = 1006)
+    rpr.set_frame_offset(0)
+    assert offset != rpr.get_matrix_chained(frame = 1006)
+    assert offset == rpr.get_matrix_chained(frame = 105)
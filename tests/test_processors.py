@@ -0,0 +1,118 @@
+import os
+
+from pathlib import Path
+
+import numpy as np
+import PyOpenColorIO as OCIO
+
+from lablib import luts, operators, processors
+
+
+def _get_color_processor(tmp_path):
+    config = OCIO.Config.CreateFromBuiltinConfig("cg-config-v2.1.0_aces-v1.3_ocio-v2.3")
+    config_path = tmp_path / "config.ocio"
+    config_path.write_text(config.serialize())
+    return processors.ColorProcessor(
+        operators = [
+            operators.ColorSpaceTransform(src = "ACEScg", dst = "ACEScct"),
+            operators.CDLTransform(slope = [1.1, 0.95, 1.05],
+                                   offset = [0.01, -0.01, 0.0],
+                                   power = [1.2, 1.0, 0.9],
+                                   sat = 0.85),
+            operators.ColorSpaceTransform(src = "ACEScct", dst = "ACEScg")
+        ],
+        config_path = config_path.as_posix(),
+        staging_dir = (tmp_path / "staging").as_posix(),
+        working_space = "ACEScg"
+    )
+
+
+def _apply(processor, pixels):
+    result = pixels.copy()
+    processor.getDefaultCPUProcessor().apply(
+        OCIO.PackedImageDesc(result, result.shape[0], 1, 3))
+    return result
+
+
+def test_baked_lut_matches_unbaked_chain(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABLIB_CACHE_DIR", (tmp_path / "cache").as_posix())
+    # linear pixels from about 2^-6 to 2^4, inside the default shaper range
+    rng = np.random.default_rng(0)
+    pixels = (2.0 ** rng.uniform(-6.0, 4.0, (4096, 3))).astype(np.float32)
+    expected = _apply(_get_color_processor(tmp_path).get_processor(), pixels)
+    color_proc = _get_color_processor(tmp_path)
+    color_proc.set_bake(True)
+    result = _apply(color_proc.get_processor(), pixels)
+    error = np.abs(result - expected) / np.maximum(np.abs(expected), 1.0)
+    assert error.max() < 2e-3
+
+
+def test_config_cache_hit_skips_processing(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABLIB_CACHE_DIR", (tmp_path / "cache").as_posix())
+    color_proc = _get_color_processor(tmp_path)
+    config_hash = color_proc.get_config_hash()
+    # the hash follows the chain, not the processor instance
+    assert _get_color_processor(tmp_path).get_config_hash() == config_hash
+    color_proc.set_bake(True)
+    assert color_proc.get_config_hash() != config_hash
+    color_proc.set_bake(False)
+
+    cached = tmp_path / "cache" / "configs" / "{}.ocio".format(config_hash)
+    cached.parent.mkdir(parents = True, exist_ok = True)
+    cached.write_text("cached")
+    os.utime(cached.as_posix(), (1, 1))
+    assert color_proc.create_config() == cached.as_posix()
+    assert color_proc.is_config_cached()
+    # a hit refreshes the mtime, so eviction keeps the configs in use
+    assert cached.stat().st_mtime > 1
+    assert cached.read_text() == "cached"
+
+
+def test_evict_config_cache_drops_oldest(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABLIB_CACHE_DIR", (tmp_path / "cache").as_posix())
+    config_dir = tmp_path / "cache" / "configs"
+    config_dir.mkdir(parents = True)
+    for age, name in enumerate(["new", "middle", "old"]):
+        path = config_dir / "{}.ocio".format(name)
+        path.write_bytes(b"x" * 100)
+        os.utime(path.as_posix(), (1000 - age, 1000 - age))
+    (config_dir / "notes.txt").write_bytes(b"x" * 1000)
+    removed = processors.evict_config_cache(250)
+    assert [Path(p).name for p in removed] == ["old.ocio"]
+    assert sorted(p.name for p in config_dir.iterdir()) == [
+        "middle.ocio", "new.ocio", "notes.txt"]
+
+
+def _apply_cdls(cdls, pixels):
+    for cdl in cdls:
+        pixels = luts.apply_cdl(pixels, cdl.slope, cdl.offset, cdl.power, cdl.sat)
+    return pixels
+
+
+def test_optimizer_removes_identities():
+    chain = [
+        operators.CDLTransform(slope = [1.0, 1.0, 1.0]),
+        operators.ColorSpaceTransform(src = "ACEScg", dst = "ACEScg"),
+        operators.CDLTransform(slope = [2.0, 1.0, 1.0], disable = True),
+        operators.ColorSpaceTransform(src = "ACEScg", dst = "ACEScct"),
+        operators.ColorSpaceTransform(src = "ACEScct", dst = "ACEScg"),
+        operators.FileTransform(src = "grade.cube")
+    ]
+    result, report = processors.optimize_color_operators(chain)
+    assert result == [chain[-1]]
+    assert len(report) == 4
+
+
+def test_optimizer_fuses_cdls():
+    first = operators.CDLTransform(slope = [1.1, 0.9, 1.0], offset = [0.01, 0.0, -0.02])
+    second = operators.CDLTransform(slope = [0.8, 1.2, 1.0], offset = [0.0, 0.05, 0.0],
+                                    power = [1.1, 1.0, 0.9], sat = 0.8)
+    result, report = processors.optimize_color_operators([first, second])
+    assert len(result) == 1 and report == ["Fused CDLTransform at 1 into 0"]
+    pixels = np.random.default_rng(0).uniform(0.0, 2.0, (256, 3)).astype(np.float32)
+    np.testing.assert_allclose(_apply_cdls(result, pixels),
+                               _apply_cdls([first, second], pixels), atol = 1e-5)
+    # a saturation in between is not linear, the pair stays as it is
+    first.sat = 0.5
+    result, report = processors.optimize_color_operators([first, second])
+    assert result == [first, second] and not report
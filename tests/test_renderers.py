@@ -0,0 +1,192 @@
+import os
+import signal
+import sys
+
+import pytest
+
+from lablib import cache, operators, processors, renderers
+from lablib.operators import SequenceInfo
+
+
+# stands in for oiiotool, logs the frames it was asked for and writes
+# every output frame from its source bytes. A '<log>.fail.<frames>' file
+# makes the next call for those frames fail once.
+_FAKE_OIIOTOOL = """#!{python}
+import os
+import sys
+args = sys.argv[1:]
+spec = args[args.index("--frames") + 1]
+frames = []
+for part in spec.split(","):
+    start, _, end = part.partition("-")
+    frames.extend(range(int(start), int(end or start) + 1))
+src, dst = args[args.index("-i") + 1], args[args.index("-o") + 1]
+with open({log!r}, "a") as f:
+    f.write(spec + "\\n")
+if os.path.exists({log!r} + ".fail." + spec):
+    os.remove({log!r} + ".fail." + spec)
+    sys.exit(1)
+for frame in frames:
+    with open(src.replace("#", "%04d" % frame), "rb") as f:
+        data = f.read()
+    with open(dst.replace("#", "%04d" % frame), "wb") as f:
+        f.write(data[::-1])
+"""
+
+
+def _setup(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log_path = tmp_path / "oiiotool.log"
+    tool = bin_dir / "oiiotool"
+    tool.write_text(_FAKE_OIIOTOOL.format(python = sys.executable, log = log_path.as_posix()))
+    tool.chmod(0o755)
+    monkeypatch.setenv("PATH", bin_dir.as_posix() + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("LABLIB_CACHE_DIR", (tmp_path / "cache").as_posix())
+    plate_dir = tmp_path / "plate"
+    plate_dir.mkdir()
+    for frame in range(1001, 1004):
+        (plate_dir / "plate.{}.dpx".format(frame)).write_bytes(os.urandom(300000))
+    return plate_dir, log_path
+
+
+def _get_renderer(tmp_path, plate_dir, name):
+    rpr = processors.RepoProcessor(
+        operators = [operators.RepoTransform(translate = [4.0, 0.0], scale = [1.0, 1.0])],
+        source_width = 64,
+        source_height = 32,
+        dest_width = 64,
+        dest_height = 32
+    )
+    rend = renderers.DefaultRenderer(
+        repo_proc = rpr,
+        source_sequence = SequenceInfo().compute_longest(plate_dir.as_posix()),
+        staging_dir = (tmp_path / "out").as_posix(),
+        name = name
+    )
+    rend.set_threads(1)
+    return rend
+
+
+def _render(tmp_path, plate_dir, render_cache, name):
+    rend = _get_renderer(tmp_path, plate_dir, name)
+    rend.set_render_cache(render_cache)
+    rend.render()
+    return rend
+
+
+def test_render_cache_misses_on_same_size_edit(tmp_path, monkeypatch):
+    plate_dir, log_path = _setup(tmp_path, monkeypatch)
+    render_cache = cache.RenderCache()
+    _render(tmp_path, plate_dir, render_cache, "v001")
+    assert log_path.read_text().split() == ["1001-1003"]
+
+    # a paint fix between the sampled blocks, the file size stays the same
+    frame_path = plate_dir / "plate.1002.dpx"
+    data = bytearray(frame_path.read_bytes())
+    data[90000:90016] = bytes(16)
+    frame_path.write_bytes(bytes(data))
+
+    log_path.write_text("")
+    _render(tmp_path, plate_dir, render_cache, "v002")
+    assert log_path.read_text().split() == ["1002"]
+    assert render_cache.get_stats()["hits"] == 2
+    output = tmp_path / "out" / "v002" / "plate.1002.dpx"
+    assert output.read_bytes() == bytes(data)[::-1]
+
+
+
+def test_calibration_without_commands_fails(tmp_path, monkeypatch):
+    plate_dir, _ = _setup(tmp_path, monkeypatch)
+    rend = _get_renderer(tmp_path, plate_dir, "v001")
+    result = rend._run_calibration([], 2, 1)
+    assert (result["fps"], result["peak_rss"]) == (0.0, 0)
+
+
+def test_run_measured_return_codes(tmp_path, monkeypatch):
+    plate_dir, _ = _setup(tmp_path, monkeypatch)
+    rend = _get_renderer(tmp_path, plate_dir, "v001")
+    code, peak_rss = rend._run_measured([sys.executable, "-c", "raise SystemExit(3)"])
+    assert code == 3 and peak_rss > 0
+    code, _ = rend._run_measured([sys.executable, "-c",
+                                  "import os, signal; os.kill(os.getpid(), signal.SIGTERM)"])
+    assert code == -signal.SIGTERM
+
+
+def test_roi_crop_follows_the_read(tmp_path, monkeypatch):
+    plate_dir, _ = _setup(tmp_path, monkeypatch)
+    rend = _get_renderer(tmp_path, plate_dir, "v001")
+    # a 2x zoom on the plate center only needs the middle of the source
+    rend.repo_proc.operators = [operators.RepoTransform(scale = [2.0, 2.0],
+                                                        center = [32.0, 16.0])]
+    cmd = rend._get_oiiotool_cmd()
+    src_index = cmd.index("-i")
+    assert cmd[src_index - 2:src_index] == ["--autotile", "256"]
+    assert cmd[src_index + 2] == "--crop"
+    x, y, width, height = rend.repo_proc.get_source_roi()
+    assert cmd[src_index + 3] == "{}x{}+{}+{}".format(width, height, x, y)
+    # padded by the cubic radius around the visible 32x16 window
+    assert (x, y, width, height) == (13, 5, 38, 22)
+
+    rend.set_use_roi(False)
+    cmd = rend._get_oiiotool_cmd()
+    assert "--autotile" not in cmd and cmd.count("--crop") == 1
+
+
+def test_roi_skipped_for_full_plate(tmp_path, monkeypatch):
+    plate_dir, _ = _setup(tmp_path, monkeypatch)
+    rend = _get_renderer(tmp_path, plate_dir, "v001")
+    rend.repo_proc.operators = [operators.RepoTransform(scale = [0.5, 0.5])]
+    assert rend.repo_proc.get_roi_cmd() == []
+    cmd = rend._get_oiiotool_cmd()
+    assert "--autotile" not in cmd and cmd.count("--crop") == 1
+
+
+def test_failed_chunk_is_retried(tmp_path, monkeypatch):
+    plate_dir, log_path = _setup(tmp_path, monkeypatch)
+    rend = _get_renderer(tmp_path, plate_dir, "v001")
+    rend.set_workers(1)
+    rend.set_chunks(3, retries = 1)
+    (tmp_path / "oiiotool.log.fail.1002").write_text("")
+    rend.render()
+    assert log_path.read_text().split() == ["1001", "1002", "1002", "1003"]
+    for frame in range(1001, 1004):
+        assert (tmp_path / "out" / "v001" / "plate.{}.dpx".format(frame)).is_file()
+
+
+def test_failed_chunk_without_retries_raises(tmp_path, monkeypatch):
+    plate_dir, log_path = _setup(tmp_path, monkeypatch)
+    rend = _get_renderer(tmp_path, plate_dir, "v001")
+    rend.set_workers(1)
+    rend.set_chunks(3, retries = 0)
+    (tmp_path / "oiiotool.log.fail.1003").write_text("")
+    with pytest.raises(RuntimeError, match = "1003 after 1 attempts"):
+        rend.render()
+    # finished chunks are kept in the manifest for the next run
+    rend.render()
+    assert log_path.read_text().split() == ["1001", "1002", "1003", "1003"]
+
+
+def test_incremental_render_skips_finished_frames(tmp_path, monkeypatch):
+    plate_dir, log_path = _setup(tmp_path, monkeypatch)
+    rend = _get_renderer(tmp_path, plate_dir, "v001")
+    rend.render()
+    assert log_path.read_text().split() == ["1001-1003"]
+
+    log_path.write_text("")
+    rend.render()
+    assert log_path.read_text() == ""
+
+    # a missing output and a changed pipeline are both rendered again
+    (tmp_path / "out" / "v001" / "plate.1003.dpx").unlink()
+    rend.render()
+    assert log_path.read_text().split() == ["1003"]
+    log_path.write_text("")
+    rend.repo_proc.operators[0].translate = [2.0, 0.0]
+    rend.render()
+    assert log_path.read_text().split() == ["1001-1003"]
+
+    log_path.write_text("")
+    rend.set_incremental(False)
+    rend.render()
+    assert log_path.read_text().split() == ["1001-1003"]
@@ -0,0 +1,198 @@
+import os
+import shutil
+
+from lablib import sequences
+
+
+def _touch_sequence(directory, head, frames, tail = ".exr", padding = 4):
+    directory.mkdir(parents = True, exist_ok = True)
+    for frame in frames:
+        (directory / "{}{:0{}d}{}".format(head, frame, padding, tail)).write_bytes(b"x")
+
+
+def _make_tree(root):
+    # sequences at every depth, each directory also has subdirectories
+    _touch_sequence(root, "top.", range(1, 4))
+    _touch_sequence(root / "a", "a.", range(1001, 1006))
+    _touch_sequence(root / "a" / "b", "b.", range(10, 13))
+    _touch_sequence(root / "a" / "b" / "c", "c.", [1, 2, 5])
+    _touch_sequence(root / "x", "x.", range(1, 3))
+
+
+def _walked(root, **kwargs):
+    return sorted(
+        "{}/{}".format(s.path[len(root.as_posix()):], s.hash_string)
+        for s in sequences.walk_sequences(root.as_posix(), **kwargs)
+    )
+
+
+_EXPECTED_TREE = [
+    "/a/a.#.exr",
+    "/a/b/b.#.exr",
+    "/a/b/c/c.#.exr",
+    "/top.#.exr",
+    "/x/x.#.exr"
+]
+
+
+def test_walk_nested_tree(tmp_path):
+    _make_tree(tmp_path)
+    assert _walked(tmp_path) == _EXPECTED_TREE
+
+
+def test_walk_nested_tree_with_index(tmp_path):
+    _make_tree(tmp_path / "plates")
+    index = sequences.SequenceIndex((tmp_path / "index.db").as_posix(), racy_window = 0)
+    try:
+        for _ in range(2):
+            assert _walked(tmp_path / "plates", index = index) == _EXPECTED_TREE
+        assert index.hits == 5
+    finally:
+        index.close()
+
+
+def test_walk_filters_and_depth(tmp_path):
+    _make_tree(tmp_path)
+    assert _walked(tmp_path, max_depth = 1) == ["/a/a.#.exr", "/top.#.exr", "/x/x.#.exr"]
+    assert _walked(tmp_path, exclude = ["b"]) == ["/a/a.#.exr", "/top.#.exr", "/x/x.#.exr"]
+    assert _walked(tmp_path, include = ["a.*"]) == ["/a/a.#.exr"]
+
+
+def test_scan_directory_groups_sequences(tmp_path):
+    _touch_sequence(tmp_path, "plate.", [1001, 1002, 1003, 1010])
+    _touch_sequence(tmp_path, "plate.", [1, 2], tail = ".jpg")
+    (tmp_path / "notes.txt").write_text("no frame number")
+    scans = sequences.scan_directory(tmp_path.as_posix())
+    assert [(s.head, s.tail) for s in scans] == [("plate.", ".exr"), ("plate.", ".jpg")]
+    longest = scans[0]
+    assert (longest.frame_start, longest.frame_end) == (1001, 1010)
+    assert longest.gaps == [(1004, 1009)]
+    assert longest.format_string == "plate.%04d.exr"
+    assert not longest.mixed_padding
+
+
+def test_scan_directory_mixed_padding(tmp_path):
+    _touch_sequence(tmp_path, "shot.", [1, 2], padding = 1)
+    _touch_sequence(tmp_path, "shot.", [3, 4, 5], padding = 4)
+    scans = sequences.scan_directory(tmp_path.as_posix())
+    assert [(s.padding, s.frames.to_spec(), s.mixed_padding) for s in scans] == [
+        (4, "3-5", True),
+        (1, "1-2", True)
+    ]
+
+
+def test_index_hit_update_and_invalidate(tmp_path):
+    plate_dir = tmp_path / "plate"
+    _touch_sequence(plate_dir, "plate.", range(1, 4))
+    _touch_sequence(plate_dir, "other.", [1])
+    index = sequences.SequenceIndex((tmp_path / "index.db").as_posix(), racy_window = 0)
+    try:
+        first = sequences.scan_directory(plate_dir.as_posix(), index)
+        assert (index.misses, index.hits) == (1, 0)
+        assert sequences.scan_directory(plate_dir.as_posix(), index) == first
+        assert index.hits == 1
+
+        _touch_sequence(plate_dir, "plate.", [4])
+        updated = sequences.scan_directory(plate_dir.as_posix(), index)
+        assert index.updates == 1
+        assert updated[0].frames.to_spec() == "1-4"
+        # untouched sequences come back from the index as they were
+        assert updated[1] == first[1]
+
+        index.invalidate(plate_dir.as_posix())
+        assert sequences.scan_directory(plate_dir.as_posix(), index) == updated
+        assert index.misses == 2
+    finally:
+        index.close()
+
+
+def test_frameset_run_length_ranges():
+    frames = sequences.FrameSet.from_frames([5, 1, 2, 3, 3, 10, 11, 7])
+    assert frames.ranges() == [(1, 3), (5, 5), (7, 7), (10, 11)]
+    assert len(frames) == 7
+    assert (frames.first, frames.last) == (1, 11)
+    assert frames.gaps() == [(4, 4), (6, 6), (8, 9)]
+    assert list(frames) == [1, 2, 3, 5, 7, 10, 11]
+    assert frames[4] == 7 and frames[-1] == 11 and frames[1:3] == [2, 3]
+    assert frames.index(10) == 5
+    assert 5 in frames and 4 not in frames
+
+
+def test_frameset_merges_overlapping_ranges():
+    frames = sequences.FrameSet([(10, 20), (1, 5), (6, 8), (15, 25)])
+    assert frames.ranges() == [(1, 8), (10, 25)]
+    assert len(frames) == 24
+
+
+def test_frameset_str_round_trip():
+    frames = sequences.FrameSet.from_frames([-2, -1, 0, 1001, 1003, 1004])
+    assert str(frames) == "-2-0,1001,1003-1004"
+    assert sequences.FrameSet.from_spec(str(frames)) == frames
+    assert sequences.FrameSet.from_spec("") == sequences.FrameSet()
+
+
+def test_frameset_split():
+    chunks = sequences.FrameSet.from_spec("1-5,8-10").split(3)
+    assert [str(c) for c in chunks] == ["1-3", "4-5,8", "9-10"]
+
+
+def test_sequence_frames_paths():
+    frames = sequences.SequenceFrames(
+        path = "/plates/sh010",
+        format_string = "plate.%04d.exr",
+        frame_set = sequences.FrameSet.from_spec("1001-1003")
+    )
+    assert len(frames) == 3
+    assert frames[0] == "/plates/sh010/plate.1001.exr"
+    assert frames[-1] == "/plates/sh010/plate.1003.exr"
+    assert frames[1:] == ["/plates/sh010/plate.1002.exr", "/plates/sh010/plate.1003.exr"]
+    assert list(frames)[1] == frames.get_path(1002)
+    assert "/plates/sh010/plate.1002.exr" in frames
+    assert "plate.1002.exr" in frames
+    assert "/plates/sh010/plate.1004.exr" not in frames
+    assert "/plates/other/plate.1002.exr" not in frames
+
+
+def test_sequence_frames_equality():
+    frame_set = sequences.FrameSet.from_spec("1-3")
+    frames = sequences.SequenceFrames("/plates", "a.%04d.exr", frame_set)
+    assert frames == sequences.SequenceFrames("/plates", "a.%04d.exr",
+                                              sequences.FrameSet.from_spec("1-3"))
+    assert frames != sequences.SequenceFrames("/plates", "b.%04d.exr", frame_set)
+
+
+def _write_plate(directory, frames):
+    directory.mkdir(parents = True)
+    for frame in frames:
+        (directory / "plate.{:04d}.exr".format(frame)).write_bytes(os.urandom(400000))
+    return sequences.SequenceFrames(directory.as_posix(), "plate.%04d.exr",
+                                    sequences.FrameSet.from_frames(frames))
+
+
+def test_fingerprints_find_changed_frames(tmp_path):
+    v001 = _write_plate(tmp_path / "v001", range(1001, 1006))
+    first = sequences.FingerprintIndex((tmp_path / "v001.json").as_posix())
+    assert first.update(v001).to_spec() == "1001-1005"
+    first.save()
+
+    v002_dir = tmp_path / "v002"
+    v002_dir.mkdir()
+    for frame in v001.frame_set:
+        name = "plate.{:04d}.exr".format(frame)
+        if frame == 1001:
+            # hard linked frames are trusted by stat alone
+            os.link(v001.get_path(frame), (v002_dir / name).as_posix())
+        else:
+            shutil.copyfile(v001.get_path(frame), (v002_dir / name).as_posix())
+    # an edit that keeps the size and misses the sampled blocks
+    data = bytearray((v002_dir / "plate.1003.exr").read_bytes())
+    data[100000:100016] = bytes(16)
+    (v002_dir / "plate.1003.exr").write_bytes(bytes(data))
+    (v002_dir / "plate.1004.exr").write_bytes(data[:1000])
+    v002 = sequences.SequenceFrames(v002_dir.as_posix(), "plate.%04d.exr", v001.frame_set)
+
+    previous = sequences.FingerprintIndex((tmp_path / "v001.json").as_posix())
+    second = sequences.FingerprintIndex((tmp_path / "v002.json").as_posix())
+    assert second.update(v002, previous).to_spec() == "1003-1004"
+    stats = second.get_stats()
+    assert (stats["stat"], stats["full"], stats["changed"], stats["entries"]) == (2, 3, 2, 5)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from lablib import timecode
+
+
+RATES = [24.0, 25.0, 24000 / 1001, 30000 / 1001, 60000 / 1001]
+
+
+def _get_frames(rate):
+    # both ends of the day, minute and ten minute boundaries, and a random spread
+    separator = ";" if timecode.is_drop_frame_rate(rate) else ":"
+    last = timecode.from_timecode("23:59:59{}{:02d}".format(
+        separator, timecode.get_nominal_rate(rate) - 1), rate)
+    edges = [0, 1, last]
+    for minute in (1, 9, 10, 11):
+        first = timecode.from_timecode("00:{:02d}:00{}00".format(minute, separator), rate)
+        edges.extend([first - 1, first, first + 1])
+    rng = np.random.default_rng(1)
+    return np.concatenate([edges, rng.integers(0, last + 1, 2000)])
+
+
+def test_known_drop_frame_timecodes():
+    assert timecode.to_timecode(1800, 30000 / 1001, True) == "00:01:00;02"
+    assert timecode.to_timecode(17982, 30000 / 1001, True) == "00:10:00;00"
+    assert timecode.to_timecode(3600, 60000 / 1001, True) == "00:01:00;04"
+    assert timecode.to_timecode(86400, 24.0) == "01:00:00:00"
+
+
+@pytest.mark.parametrize("rate", RATES)
+def test_round_trip(rate):
+    frames = _get_frames(rate)
+    drop_frame = timecode.is_drop_frame_rate(rate)
+    timecodes = timecode.frames_to_timecodes(frames, rate, drop_frame)
+    assert timecode.timecodes_to_frames(timecodes, rate).tolist() == frames.tolist()
+
+
+@pytest.mark.parametrize("rate", RATES)
+def test_matches_otio(rate):
+    otio = pytest.importorskip("opentimelineio")
+    frames = _get_frames(rate)
+    drop_frame = timecode.is_drop_frame_rate(rate)
+    expected = [
+        otio.opentime.to_timecode(otio.opentime.from_frames(int(f), rate), rate, drop_frame)
+        for f in frames
+    ]
+    assert list(timecode.frames_to_timecodes(frames, rate, drop_frame)) == expected
+    assert timecode.timecodes_to_frames(expected, rate).tolist() == [
+        otio.opentime.from_timecode(tc, rate).to_frames(rate) for tc in expected]
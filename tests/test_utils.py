@@ -0,0 +1,17 @@
+from lablib import cache, utils
+
+
+def test_failed_probe_is_not_cached(tmp_path, monkeypatch):
+    path = tmp_path / "clip.mov"
+    path.write_bytes(b"not an image")
+    monkeypatch.setattr(utils, "_metadata_cache", cache.MetadataCache())
+    empty = dict.fromkeys(("origin_x", "origin_y", "width", "height", "display_width",
+                           "display_height", "channels", "fps", "par", "timecode"))
+    monkeypatch.setattr(utils, "_probe_image_info", lambda p: dict(empty, filename = p))
+    utils.read_image_info(path.as_posix())
+    assert utils.get_metadata_cache().get(path.as_posix()) is None
+
+    monkeypatch.setattr(utils, "_probe_image_info",
+                        lambda p: dict(empty, filename = p, width = 2048, height = 858))
+    assert utils.read_image_info(path.as_posix()).width == 2048
+    assert utils.get_metadata_cache().get(path.as_posix())["width"] == 2048